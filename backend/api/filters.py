@@ -1,19 +1,52 @@
 from django_filters import rest_framework
 
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
+from recipes.utils import normalize_name
 
 
 class RecipeFilter(rest_framework.FilterSet):
+    name = rest_framework.CharFilter(method='filter_name')
+    search = rest_framework.CharFilter(method='filter_search')
     tags = rest_framework.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name="slug",
         queryset=Tag.objects.all()
     )
-    is_favorited = rest_framework.BooleanFilter(field_name='is_favorited')
+    is_favorited = rest_framework.BooleanFilter(
+        method='filter_is_favorited'
+    )
     is_in_shopping_cart = rest_framework.BooleanFilter(
-        field_name='is_in_shopping_cart'
+        method='filter_is_in_shopping_cart'
     )
 
     class Meta:
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['name', 'search', 'author', 'tags',
+                  'is_favorited', 'is_in_shopping_cart']
         model = Recipe
+
+    @staticmethod
+    def filter_name(queryset, name, value):
+        return queryset.filter(search_name__startswith=normalize_name(value))
+
+    @staticmethod
+    def filter_search(queryset, name, value):
+        # Cursor pagination orders by date, pages by number keep the rank.
+        return search_recipes(queryset, value).order_by('-search_rank',
+                                                        '-pub_date', '-id')
+
+    def filter_viewer_recipes(self, queryset, related_name, value):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        # Semi-join driven from the viewer's own rows.
+        recipe_ids = getattr(user, related_name).values('recipe_id')
+        if value:
+            return queryset.filter(id__in=recipe_ids)
+        return queryset.exclude(id__in=recipe_ids)
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_viewer_recipes(queryset, 'favorite', value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_viewer_recipes(queryset, 'shopping_cart', value)
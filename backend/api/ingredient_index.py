@@ -0,0 +1,155 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+
+from django.db import DatabaseError
+
+from recipes.models import Ingredient
+from recipes.utils import normalize_name
+
+from .utils import can_be_cached, get_cache_version
+
+INGREDIENTS_VERSION = 'ingredients'
+SEARCH_RESULTS_LIMIT = 20
+SIMILARITY_THRESHOLD = 0.5
+
+_index = None
+
+
+def word_trigrams(text):
+    # The same padding as pg_trgm uses: two spaces before
+    # and one space after every word.
+    trigrams = set()
+    for word in re.findall(r'\w+', text):
+        word = f'  {word} '
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+class IngredientIndex:
+    """
+    Ingredients already serialized as `IngredientSerializer` does,
+    sorted by normalized name for prefix lookups with bisect.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        items = sorted(((normalize_name(row['name']), row) for row in rows),
+                       key=lambda item: item[0])
+        self.keys = [key for key, _ in items]
+        self.rows = [row for _, row in items]
+
+        word_suffixes = list()
+        substrings = dict()
+        trigrams = dict()
+        for position, key in enumerate(self.keys):
+            for match in re.finditer(r'\w+', key):
+                if match.start():
+                    word_suffixes.append((key[match.start():], position))
+            for i in range(len(key) - 2):
+                substrings.setdefault(key[i:i + 3], set()).add(position)
+            for trigram in word_trigrams(key):
+                trigrams.setdefault(trigram, list()).append(position)
+        word_suffixes.sort()
+        self.word_suffixes = [suffix for suffix, _ in word_suffixes]
+        self.word_positions = [position for _, position in word_suffixes]
+        self.substrings = substrings
+        self.trigrams = trigrams
+
+    @classmethod
+    def from_db(cls, version=None):
+        rows = (
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit__name'
+            )
+        )
+        return cls(rows, version)
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        start = bisect_left(keys, prefix)
+        return start, bisect_left(keys, prefix + chr(0x10FFFF), start)
+
+    def startswith(self, prefix):
+        start, end = self._prefix_range(self.keys, normalize_name(prefix))
+        return self.rows[start:end]
+
+    def _substring_positions(self, query):
+        if len(query) < 3:
+            return [position for position, key in enumerate(self.keys)
+                    if query in key]
+        postings = sorted(
+            (self.substrings.get(query[i:i + 3], set())
+             for i in range(len(query) - 2)),
+            key=len
+        )
+        candidates = set.intersection(*postings)
+        return sorted(position for position in candidates
+                      if query in self.keys[position])
+
+    def _similar_positions(self, query):
+        query_trigrams = word_trigrams(query)
+        if not query_trigrams:
+            return []
+        counter = Counter()
+        for trigram in query_trigrams:
+            counter.update(self.trigrams.get(trigram, ()))
+        min_count = SIMILARITY_THRESHOLD * len(query_trigrams)
+        similar = [(-count, len(self.keys[position]), position)
+                   for position, count in counter.items()
+                   if count >= min_count]
+        similar.sort()
+        return [position for _, _, position in similar]
+
+    def search(self, query, limit=SEARCH_RESULTS_LIMIT):
+        """
+        Rank ingredients by match quality: exact match, prefix,
+        prefix of a word, substring and finally trigram similarity.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        found = dict()
+
+        def collect(positions):
+            for position in positions:
+                if len(found) >= limit:
+                    return True
+                found.setdefault(position, self.rows[position])
+            return len(found) >= limit
+
+        start, end = self._prefix_range(self.keys, query)
+        exact_end = bisect_left(self.keys, query + '\0', start, end)
+        start_word, end_word = self._prefix_range(self.word_suffixes, query)
+        tiers = (
+            lambda: range(start, exact_end),
+            lambda: range(exact_end, end),
+            lambda: sorted(self.word_positions[start_word:end_word]),
+            lambda: self._substring_positions(query),
+            lambda: self._similar_positions(query),
+        )
+        for tier in tiers:
+            if collect(tier()):
+                break
+        return list(found.values())
+
+
+def get_ingredient_index():
+    global _index
+    version = get_cache_version(INGREDIENTS_VERSION)
+    if _index is not None and _index.version == version:
+        return _index
+    index = IngredientIndex.from_db(version)
+    if can_be_cached():
+        _index = index
+    return index
+
+
+def warm_up_ingredient_index():
+    try:
+        get_ingredient_index()
+    except DatabaseError:
+        # Database is not migrated yet, the index
+        # will be built on the first request.
+        pass
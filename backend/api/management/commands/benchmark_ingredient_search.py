@@ -0,0 +1,74 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.ingredient_index import IngredientIndex
+
+INGREDIENTS_FILE = 'static/ingredients.json'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ingredient search over the in-memory index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=INGREDIENTS_FILE)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    @staticmethod
+    def make_typo(word, rnd):
+        if len(word) < 4:
+            return word
+        i = rnd.randrange(1, len(word) - 1)
+        return word[:i] + rnd.choice('аеиоуя') + word[i + 1:]
+
+    def gen_queries(self, names, count, rnd):
+        queries = {'prefix': [], 'word': [], 'typo': []}
+        for _ in range(count):
+            name = rnd.choice(names)
+            queries['prefix'].append(name[:rnd.randint(1, 6)])
+            word = rnd.choice(name.split())
+            queries['word'].append(word[:rnd.randint(3, 8)])
+            queries['typo'].append(self.make_typo(word, rnd))
+        return queries
+
+    @staticmethod
+    def measure(func, queries):
+        timings = list()
+        for query in queries:
+            start = time.perf_counter_ns()
+            func(query)
+            timings.append(time.perf_counter_ns() - start)
+        timings.sort()
+        return (sum(timings) / len(timings) / 1000,
+                timings[len(timings) // 2] / 1000,
+                timings[int(len(timings) * 0.99)] / 1000)
+
+    def handle(self, *args, **options):
+        with open(options['file']) as file:
+            items = json.load(file)
+        rows = [{'id': pk, 'name': item['name'],
+                 'measurement_unit': item['measurement_unit']}
+                for pk, item in enumerate(items, start=1)]
+
+        start = time.perf_counter()
+        index = IngredientIndex(rows)
+        build_time = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'Index of {len(rows)} ingredients '
+                          f'built in {build_time:.1f} ms')
+
+        rnd = random.Random(options['seed'])
+        names = [row['name'] for row in rows]
+        queries = self.gen_queries(names, options['queries'], rnd)
+        benchmarks = [
+            ('startswith', index.startswith, queries['prefix']),
+            ('search/prefix', index.search, queries['prefix']),
+            ('search/word', index.search, queries['word']),
+            ('search/typo', index.search, queries['typo']),
+        ]
+        for title, func, mode_queries in benchmarks:
+            mean, median, p99 = self.measure(func, mode_queries)
+            self.stdout.write(f'{title:<15} mean {mean:7.1f} us  '
+                              f'p50 {median:7.1f} us  p99 {p99:7.1f} us')
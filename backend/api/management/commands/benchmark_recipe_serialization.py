@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.recipe_fragments import (build_fragments, build_fragments_in_database,
+                                  serialize_fragments)
+from api.recipe_json import supports_recipe_documents
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Benchmark recipe serialization against the flat builder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = list()
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            func()
+            timings.append(time.perf_counter_ns() - start)
+        timings.sort()
+        return (sum(timings) / len(timings) / 1000000,
+                timings[len(timings) // 2] / 1000000,
+                timings[int(len(timings) * 0.99)] / 1000000)
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True)
+                          [:options['limit']])
+        if not recipe_ids:
+            raise CommandError('No recipes to serialize.')
+        request = RequestFactory().get('/api/recipes/')
+        renderer = JSONRenderer()
+
+        def render(builder):
+            fragments = builder(recipe_ids, request)
+            return renderer.render([fragments[pk] for pk in recipe_ids])
+
+        builders = [('serializer', serialize_fragments),
+                    ('flat', build_fragments)]
+        if supports_recipe_documents():
+            builders.append(('database', build_fragments_in_database))
+        expected = render(serialize_fragments)
+        for title, builder in builders:
+            if render(builder) != expected:
+                raise CommandError(f'Representations of {title} differ!')
+        self.stdout.write(f'Rendering {len(recipe_ids)} recipes, '
+                          f'{options["repeat"]} times')
+        for title, builder in builders:
+            mean, median, p99 = self.measure(lambda: render(builder),
+                                             options['repeat'])
+            self.stdout.write(f'{title:<10} mean {mean:7.2f} ms  '
+                              f'p50 {median:7.2f} ms  p99 {p99:7.2f} ms')
@@ -1,4 +1,9 @@
-from rest_framework import mixins, viewsets
+from django.utils.cache import parse_etags, patch_vary_headers
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from .snapshots import SnapshotResponse, get_snapshot
+from .upload_handlers import LimitedTemporaryFileUploadHandler
 
 
 class NonPartialUpdateModelViewSet(viewsets.ModelViewSet):
@@ -6,6 +11,17 @@ class NonPartialUpdateModelViewSet(viewsets.ModelViewSet):
         return super().update(request, *args, **kwargs)
 
 
+class LimitedUploadMixin:
+    """
+    Limits uploads of the view, too large ones get 413 responses.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Set before the body is read by a parser.
+        request.upload_handlers = [LimitedTemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
 class ListRetrieveCreateModelViewSet(mixins.ListModelMixin,
                                      mixins.RetrieveModelMixin,
                                      mixins.CreateModelMixin,
@@ -17,3 +33,32 @@ class ListRetrieveModelViewSet(mixins.ListModelMixin,
                                mixins.RetrieveModelMixin,
                                viewsets.GenericViewSet):
     pass
+
+
+class SnapshotListMixin:
+    """
+    Serves the whole unpaginated list from a pre-rendered snapshot
+    which is rebuilt only when the `snapshot_name` version changes.
+    """
+    snapshot_name = None
+
+    def use_snapshot(self):
+        return True
+
+    def get_snapshot_data(self):
+        return self.get_serializer(self.get_queryset(), many=True).data
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_snapshot():
+            return super().list(request, *args, **kwargs)
+        snapshot = get_snapshot(self.snapshot_name, self.get_snapshot_data)
+        media_type = request.accepted_renderer.media_type
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if (snapshot.get_etag(media_type) in if_none_match
+                or '*' in if_none_match):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED,
+                                headers=snapshot.get_headers(media_type))
+        else:
+            response = SnapshotResponse(snapshot, media_type)
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -1,6 +1,172 @@
+import base64
+import json
+from collections import OrderedDict
+from hashlib import sha1
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .utils import can_be_cached, get_cache_version
+
+MAX_PAGE_SIZE = 100
+COUNTS_VERSION = 'counts'
+COUNT_CACHE_TIMEOUT = 60 * 60
+COUNT_ESTIMATE_THRESHOLD = 10000
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator which caches `count` per SQL of the counted queryset
+    and takes the planner's estimate for big unfiltered tables.
+    """
+
+    @staticmethod
+    def estimate_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row is None or row[0] < COUNT_ESTIMATE_THRESHOLD:
+            return None
+        return int(row[0])
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        # Only filters stay in the counted query,
+        # annotations which are not used by them are dropped.
+        queryset = self.object_list.values('pk')
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        estimate = self.estimate_count(queryset)
+        if estimate is not None:
+            return estimate
+        version = get_cache_version(COUNTS_VERSION)
+        key = sha1(f'{version}:{sql}:{params}'.encode()).hexdigest()
+        count = cache.get(f'count_{key}')
+        if count is None:
+            count = queryset.count()
+            if can_be_cached():
+                cache.set(f'count_{key}', count, COUNT_CACHE_TIMEOUT)
+        return count
 
 
 class PageNumberLimitPagination(pagination.PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor pagination over a descending `(datetime, id)` key.
+    Every page is a single index range scan without COUNT and OFFSET.
+    """
+    cursor_query_param = 'cursor'
     page_size_query_param = 'limit'
     page_size = 6
+    max_page_size = MAX_PAGE_SIZE
+    date_field = 'pub_date'
+    id_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            date = parse_datetime(cursor['d'])
+            position = (date, int(cursor['i']))
+            reverse = bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        date, pk = position
+        cursor = json.dumps({'d': date.isoformat(), 'i': pk,
+                             'r': int(reverse)})
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded)
+
+    def get_position(self, instance):
+        return (getattr(instance, self.date_field),
+                getattr(instance, self.id_field))
+
+    def filter_position(self, queryset, position, reverse):
+        date, pk = position
+        lookup = 'gt' if reverse else 'lt'
+        return queryset.filter(
+            Q(**{f'{self.date_field}__{lookup}': date})
+            | Q(**{self.date_field: date, f'{self.id_field}__{lookup}': pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [self.date_field, self.id_field]
+        if not reverse:
+            ordering = [f'-{field}' for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self.filter_position(queryset, position, reverse)
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more or reverse
+        has_previous = has_more if reverse else position is not None
+        self.next = None
+        self.previous = None
+        if results and has_next:
+            self.next = self.encode_cursor(self.get_position(results[-1]),
+                                           reverse=False)
+        if results and has_previous:
+            self.previous = self.encode_cursor(
+                self.get_position(results[0]), reverse=True
+            )
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next),
+            ('previous', self.previous),
+            ('results', data),
+        ]))
+
+
+class FeedPagination(KeysetPagination):
+    id_field = 'recipe_id'
@@ -0,0 +1,174 @@
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import Favorite, IngredientRecipe, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+from .recipe_json import fetch_recipe_documents, supports_recipe_documents
+from .serializers import RecipeSerializer
+from .utils import (absolute_image_urls, can_be_cached, get_cache_version,
+                    media_url, represent_image_variants)
+
+RECIPE_FRAGMENTS_VERSION = 'recipe_fragments'
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+AUTHOR_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'slug', 'color')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+
+
+def stamp_key(recipe_id):
+    return f'recipe_stamp_{recipe_id}'
+
+
+def invalidate_recipe_fragments(recipe_ids):
+    keys = [stamp_key(recipe_id) for recipe_id in recipe_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def serialize_fragments(recipe_ids, request):
+    recipes = (Recipe.objects
+               .filter(id__in=recipe_ids)
+               .select_related('author')
+               .prefetch_related('tags')
+               .prefetch_related('ingredient_recipe'
+                                 '__ingredient__measurement_unit'))
+    serializer = RecipeSerializer(recipes, many=True,
+                                  context={'request': request})
+    # Viewer-dependent fields are skipped by the serializer
+    # because the recipes are not annotated with them.
+    return {fragment['id']: fragment for fragment in serializer.data}
+
+
+def group_rows(rows, keys):
+    groups = defaultdict(list)
+    for recipe_id, *values in rows:
+        groups[recipe_id].append(dict(zip(keys, values)))
+    return groups
+
+
+def build_fragments_in_database(recipe_ids, request):
+    fragments = fetch_recipe_documents(recipe_ids)
+    for fragment in fragments.values():
+        fragment['image'] = media_url(fragment['image'], request)
+        fragment['image_variants'] = represent_image_variants(
+            fragment['image_variants'], request
+        )
+    return fragments
+
+
+def build_fragments(recipe_ids, request):
+    """
+    The same representations as `serialize_fragments`
+    built from flat rows without serializers.
+    """
+    if settings.RECIPE_JSON_IN_DATABASE and supports_recipe_documents():
+        return build_fragments_in_database(recipe_ids, request)
+    recipes = list(Recipe.objects.filter(id__in=recipe_ids).values_list(
+        'id', 'author_id', 'name', 'text', 'image', 'image_variants',
+        'cooking_time'
+    ))
+    authors = {
+        row[0]: dict(zip(AUTHOR_FIELDS, row)) for row in
+        User.objects.filter(id__in={recipe[1] for recipe in recipes})
+        .values_list(*AUTHOR_FIELDS)
+    }
+    tags = group_rows(
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by('tag__slug')
+        .values_list('recipe_id', 'tag__id', 'tag__name', 'tag__slug',
+                     'tag__color'),
+        TAG_FIELDS
+    )
+    ingredients = group_rows(
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_ids)
+        .values_list('recipe_id', 'ingredient__id', 'ingredient__name',
+                     'ingredient__measurement_unit__name', 'amount'),
+        INGREDIENT_FIELDS
+    )
+    fragments = dict()
+    for (pk, author_id, name, text, image, image_variants,
+         cooking_time) in recipes:
+        fragments[pk] = {
+            'id': pk,
+            'author': authors[author_id],
+            'tags': tags[pk],
+            'name': name,
+            'text': text,
+            'image': media_url(image, request),
+            'image_variants': represent_image_variants(image_variants,
+                                                       request),
+            'ingredients': ingredients[pk],
+            'cooking_time': cooking_time,
+        }
+    return fragments
+
+
+def get_fragments(recipe_ids):
+    """
+    Viewer-independent representations of recipes, cached under
+    the global fragments version and a per-recipe stamp.
+    Image URLs are relative, so they do not depend on the request host.
+    """
+    version = get_cache_version(RECIPE_FRAGMENTS_VERSION)
+    stamps = cache.get_many([stamp_key(pk) for pk in recipe_ids])
+    new_stamps = {stamp_key(pk): uuid.uuid4().hex for pk in recipe_ids
+                  if stamp_key(pk) not in stamps}
+    if new_stamps:
+        cache.set_many(new_stamps, timeout=None)
+        stamps.update(new_stamps)
+    keys = {
+        pk: f'recipe_fragment_{version}_{pk}_{stamps[stamp_key(pk)]}'
+        for pk in recipe_ids
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in recipe_ids if pk not in fragments]
+    if missing:
+        built = build_fragments(missing, None)
+        fragments.update(built)
+        if can_be_cached():
+            cache.set_many({keys[pk]: fragment
+                            for pk, fragment in built.items()},
+                           timeout=FRAGMENT_CACHE_TIMEOUT)
+    return fragments
+
+
+def get_viewer_state(user, recipes):
+    """
+    Favorited recipes, recipes in the shopping cart and followed authors
+    of the viewer, limited to the given recipes.
+    """
+    if user.is_anonymous:
+        return set(), set(), set()
+    recipe_ids = [recipe.id for recipe in recipes]
+    author_ids = {recipe.author_id for recipe in recipes}
+    favorited = set(Favorite.objects.filter(
+        user_id=user.id, recipe_id__in=recipe_ids
+    ).values_list('recipe_id', flat=True))
+    in_shopping_cart = set(ShoppingCart.objects.filter(
+        user_id=user.id, recipe_id__in=recipe_ids
+    ).values_list('recipe_id', flat=True))
+    followed = set(Subscription.objects.filter(
+        user_id=user.id, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+    return favorited, in_shopping_cart, followed
+
+
+def represent_recipes(recipes, request):
+    fragments = get_fragments([recipe.id for recipe in recipes])
+    favorited, in_shopping_cart, followed = get_viewer_state(request.user,
+                                                             recipes)
+    data = list()
+    for recipe in recipes:
+        item = absolute_image_urls(fragments[recipe.id], request)
+        item['author'] = dict(item['author'],
+                              is_subscribed=recipe.author_id in followed)
+        item['is_favorited'] = recipe.id in favorited
+        item['is_in_shopping_cart'] = recipe.id in in_shopping_cart
+        data.append(item)
+    return data
@@ -0,0 +1,108 @@
+import json
+
+from django.db import connection
+
+from recipes.models import (Ingredient, IngredientRecipe, MeasurementUnit,
+                            Recipe, Tag)
+from users.models import User
+
+# Each vendor gets the same document shape as RecipeSerializer.
+# PostgreSQL orders inside the aggregate, SQLite has no ORDER BY
+# for json_group_array and keeps the order of an ordered subquery.
+FUNCTIONS = {
+    'postgresql': {
+        'object': 'json_build_object', 'json': '',
+        'array': "COALESCE(json_agg({document} ORDER BY {order}), '[]') "
+                 "FROM {source}",
+    },
+    'sqlite': {
+        'object': 'json_object', 'json': 'json',
+        'array': "COALESCE(json_group_array(json(document)), '[]') FROM ("
+                 "SELECT {document} AS document FROM {source} "
+                 "ORDER BY {order})",
+    },
+}
+
+TAGS = {
+    'document': """{object}('id', t.id, 'name', t.name, 'slug', t.slug,
+                            'color', t.color)""",
+    'source': """{recipe_tag} rt JOIN {tag} t ON t.id = rt.tag_id
+            WHERE rt.recipe_id = r.id""",
+    'order': 't.slug',
+}
+INGREDIENTS = {
+    'document': """{object}('id', i.id, 'name', i.name,
+                            'measurement_unit', m.name,
+                            'amount', ir.amount)""",
+    'source': """{ingredient_recipe} ir
+            JOIN {ingredient} i ON i.id = ir.ingredient_id
+            JOIN {measurement_unit} m ON m.id = i.measurement_unit_id
+            WHERE ir.recipe_id = r.id""",
+    'order': 'i.name, i.id',
+}
+
+RECIPE_DOCUMENT_SQL = '''
+SELECT r.id, {object}(
+    'id', r.id,
+    'author', {json}((
+        SELECT {object}('id', u.id, 'username', u.username,
+                        'email', u.email, 'first_name', u.first_name,
+                        'last_name', u.last_name)
+        FROM {user} u WHERE u.id = r.author_id
+    )),
+    'tags', {json}((
+        SELECT {tags}
+    )),
+    'name', r.name,
+    'text', r.text,
+    'image', r.image,
+    'image_variants', {json}(r.image_variants),
+    'ingredients', {json}((
+        SELECT {ingredients}
+    )),
+    'cooking_time', r.cooking_time
+)
+FROM {recipe} r
+WHERE r.id IN ({ids})
+'''
+
+
+def get_recipe_document_sql(vendor, count):
+    """Recipe documents query of `vendor` for `count` recipe ids."""
+    functions = FUNCTIONS[vendor]
+    names = dict(
+        ids=', '.join(['%s'] * count),
+        recipe=Recipe._meta.db_table,
+        recipe_tag=Recipe.tags.through._meta.db_table,
+        tag=Tag._meta.db_table,
+        ingredient_recipe=IngredientRecipe._meta.db_table,
+        ingredient=Ingredient._meta.db_table,
+        measurement_unit=MeasurementUnit._meta.db_table,
+        user=User._meta.db_table,
+        object=functions['object'],
+        json=functions['json'],
+    )
+    return RECIPE_DOCUMENT_SQL.format(
+        tags=functions['array'].format(**TAGS).format(**names),
+        ingredients=functions['array'].format(**INGREDIENTS).format(**names),
+        **names,
+    )
+
+
+def supports_recipe_documents():
+    return connection.vendor in FUNCTIONS
+
+
+def fetch_recipe_documents(recipe_ids):
+    """
+    Recipe documents built by the database in a single query,
+    `image` holds the stored file name.
+    """
+    if not recipe_ids:
+        return dict()
+    sql = get_recipe_document_sql(connection.vendor, len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(recipe_ids))
+        # psycopg2 decodes json columns itself.
+        return {pk: json.loads(document) if isinstance(document, str)
+                else document for pk, document in cursor.fetchall()}
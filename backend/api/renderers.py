@@ -0,0 +1,153 @@
+import csv
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+SHOPPING_LIST_TITLE = 'СПИСОК ПОКУПОК'
+DOCUMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, ABC):
+    """
+    Renders shopping list rows of
+    (ingredient id, name, measurement unit, amount) chunk by chunk.
+    """
+    charset = 'utf-8'
+    streaming = True
+
+    @abstractmethod
+    def render_rows(self, rows):
+        """Yields the rendered document chunk by chunk."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Shopping lists are streamed, only errors are rendered here.
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return JSONRenderer().render(data)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_rows(self, rows):
+        yield (f'---------{SHOPPING_LIST_TITLE}---------\n'
+               '================================\n')
+        for _, name, measurement_unit, amount in rows:
+            yield f'{name} - {amount} {measurement_unit}\n'
+        yield ('================================\n'
+               '-----------FOODGRAM(\u2184)----------')
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_rows(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(['name', 'measurement_unit', 'amount'])
+        for _, name, measurement_unit, amount in rows:
+            yield writer.writerow([name, measurement_unit, amount])
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def render_rows(self, rows):
+        separator = '['
+        for id, name, measurement_unit, amount in rows:
+            yield separator + json.dumps(
+                {'id': id, 'name': name,
+                 'measurement_unit': measurement_unit, 'amount': amount},
+                ensure_ascii=False,
+            )
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+@lru_cache(maxsize=None)
+def get_pdf_font():
+    path = settings.PDF_FONT_PATH
+    if not path or not os.path.exists(path):
+        return 'Helvetica'
+    name = os.path.splitext(os.path.basename(path))[0]
+    pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    Builds the whole document at once,
+    so it is rendered off the request thread and cached.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    streaming = False
+
+    MARGIN = 50
+    FONT_SIZE = 12
+    LINE_HEIGHT = 18
+
+    def render_rows(self, rows):
+        font = get_pdf_font()
+        buffer = BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        document.setTitle(SHOPPING_LIST_TITLE)
+        top = A4[1] - self.MARGIN
+        document.setFont(font, self.FONT_SIZE + 4)
+        document.drawString(self.MARGIN, top, SHOPPING_LIST_TITLE)
+        document.setFont(font, self.FONT_SIZE)
+        y = top - 2 * self.LINE_HEIGHT
+        for _, name, measurement_unit, amount in rows:
+            if y < self.MARGIN:
+                document.showPage()
+                document.setFont(font, self.FONT_SIZE)
+                y = top
+            document.drawString(self.MARGIN, y,
+                                f'{name} - {amount} {measurement_unit}')
+            y -= self.LINE_HEIGHT
+        document.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_LIST_RENDERERS = [
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+]
+if canvas is not None:
+    SHOPPING_LIST_RENDERERS.append(ShoppingListPDFRenderer)
+
+
+def get_document_cache_key(renderer, rows):
+    # Any change of the cart changes the rows and so the key.
+    digest = hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+    return f'shopping_list_{renderer.format}_{digest}'
+
+
+def cache_document(renderer_class, key, rows):
+    content = b''.join(renderer_class().render_rows(rows))
+    cache.set(key, content, DOCUMENT_CACHE_TIMEOUT)
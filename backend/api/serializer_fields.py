@@ -1,11 +1,11 @@
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 
-from recipes.models import Ingredient
 from recipes.validators import min_amount_validator
 
 from .serializers.ingredient_recipe import IngredientRecipeSerializer
 from .serializers.tag import TagSerializer
+from .utils import represent_image_variants
 from .validators import integer_validator
 
 
@@ -14,22 +14,27 @@ class IngredientsRelatedField(serializers.RelatedField):
         return IngredientRecipeSerializer(instance=ingredient_recipe).data
 
     def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            raise ValidationError('Ingredient must be an object '
+                                  'with `id` and `amount`!')
         value_names = ['id', 'amount']
         for value_name in value_names:
             if value_name not in data.keys():
                 raise ValidationError(f'Required value `{value_name}` '
                                       'not exists in ingredients field!')
-            data[value_name] = integer_validator(value_name, data[value_name])
-        min_amount_validator(data['amount'])
-        if not Ingredient.objects.filter(id=data['id']).exists():
-            raise ValidationError(f'Ingredient with `id=={data["id"]}` '
-                                  'not exists!')
-        # Creating orphans objects that will be adopted
-        # when serializer's create or update methods done.
-        return (self.queryset.create(ingredient_id=data['id'],
-                                     amount=data['amount']))
+        value = {value_name: integer_validator(value_name, data[value_name])
+                 for value_name in value_names}
+        min_amount_validator(value['amount'])
+        # Ingredients existence is checked by the serializer
+        # for all ingredients at once.
+        return value
 
 
 class TagsPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
     def to_representation(self, value):
         return TagSerializer(context=self.context, instance=value).data
+
+
+class ImageVariantsField(serializers.JSONField):
+    def to_representation(self, value):
+        return represent_image_variants(value, self.context.get('request'))
@@ -2,6 +2,8 @@ from .dynamic_fields_serializer import DynamicFieldsModelSerializer
 from .ingredient import IngredientSerializer
 from .ingredient_recipe import IngredientRecipeSerializer
 from .recipe import RecipeSerializer
+from .recipe_ids import RecipeIdsSerializer
+from .shopping_list_item import ShoppingListItemSerializer
 from .tag import TagSerializer
 from .user import UserSerializer
 from .user_set_password import UserSetPasswordSerializer
@@ -1,12 +1,19 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
-from rest_framework.fields import empty
 from rest_framework.serializers import ValidationError
+from rest_framework.utils import html
 
-from recipes.models import IngredientRecipe, Recipe, Tag
+from recipes.images import process_recipe_image
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.shopping_lists import change_shopping_lists
 from recipes.validators import min_cooking_time_validator
+from recipes.workers import run_after_commit
 
-from ..serializer_fields import (IngredientsRelatedField,
+from ..serializer_fields import (ImageVariantsField, IngredientsRelatedField,
                                  TagsPrimaryKeyRelatedField)
 from ..serializers import DynamicFieldsModelSerializer
 from ..serializers.user import UserSerializer
@@ -16,6 +23,7 @@ class RecipeSerializer(DynamicFieldsModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagsPrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
     image = Base64ImageField()
+    image_variants = ImageVariantsField(read_only=True)
     ingredients = IngredientsRelatedField(
         source='ingredient_recipe',
         queryset=IngredientRecipe.objects.all(),
@@ -29,39 +37,127 @@ class RecipeSerializer(DynamicFieldsModelSerializer):
 
     class Meta:
         fields = ['id', 'author', 'tags', 'name', 'text',
-                  'image', 'ingredients', 'cooking_time',
+                  'image', 'image_variants', 'ingredients', 'cooking_time',
                   'is_favorited', 'is_in_shopping_cart']
         model = Recipe
 
+    @staticmethod
+    def create_ingredients(recipe, ingredients):
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient_id=ingredient['id'],
+                             amount=ingredient['amount'])
+            for ingredient in ingredients
+        )
+
+    @transaction.atomic
+    def create(self, validated_data):
+        ingredients = validated_data.pop('ingredient_recipe')
+        tags = validated_data.pop('tags')
+        recipe = Recipe.objects.create(**validated_data)
+        recipe.tags.set(tags)
+        self.create_ingredients(recipe, ingredients)
+        run_after_commit(process_recipe_image, recipe.id)
+        return recipe
+
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        amounts = {ingredient['id']: ingredient['amount']
+                   for ingredient in ingredients}
+        stored = {
+            ingredient_recipe.ingredient_id: ingredient_recipe
+            for ingredient_recipe in recipe.ingredient_recipe.order_by()
+            .only('id', 'ingredient_id', 'amount')
+        }
+        deleted = [ingredient_recipe.id
+                   for ingredient_id, ingredient_recipe in stored.items()
+                   if ingredient_id not in amounts]
+        old_amounts = {ingredient_id: ingredient_recipe.amount
+                       for ingredient_id, ingredient_recipe in stored.items()}
+        changed = list()
+        for ingredient_id, ingredient_recipe in stored.items():
+            amount = amounts.get(ingredient_id, ingredient_recipe.amount)
+            if amount != ingredient_recipe.amount:
+                ingredient_recipe.amount = amount
+                changed.append(ingredient_recipe)
+        created = [{'id': ingredient_id, 'amount': amount}
+                   for ingredient_id, amount in amounts.items()
+                   if ingredient_id not in stored]
+        if deleted:
+            IngredientRecipe.objects.filter(id__in=deleted).delete()
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        if created:
+            RecipeSerializer.create_ingredients(recipe, created)
+        # Shopping lists of carts holding the recipe follow the change.
+        deltas = {ingredient_id: -amount
+                  for ingredient_id, amount in old_amounts.items()}
+        for ingredient_id, amount in amounts.items():
+            deltas[ingredient_id] = deltas.get(ingredient_id, 0) + amount
+        change_shopping_lists(deltas, recipe_id=recipe.id)
+
+    @staticmethod
+    def is_same_image(stored, image):
+        return (bool(stored)
+                and stored.storage.get_content_name(stored.field.upload_to
+                                                    + image.name, image)
+                == stored.name)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        # Deleting current recipe's IngredientRecipe objects.
-        # They will be replaced by orphans from
-        # IngredientsRelatedField's to_internal_value() method.
-        instance.ingredient_recipe.all().delete()
-        return super().update(instance, validated_data)
+        ingredients = validated_data.pop('ingredient_recipe', None)
+        tags = validated_data.pop('tags', None)
+        image = validated_data.get('image')
+        if image is not None and self.is_same_image(instance.image, image):
+            # Keeping the stored file instead of writing a copy.
+            del validated_data['image']
+        if 'image' in validated_data:
+            validated_data['image_variants'] = dict()
+            # The old file may be shared, the garbage collector removes it.
+            run_after_commit(process_recipe_image, instance.id)
+        instance = super().update(instance, validated_data)
+        if tags is not None:
+            # `set()` only adds and removes the difference.
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        return instance
+
+    @staticmethod
+    def parse_form(data):
+        # Multipart forms send tags as repeated fields
+        # and ingredients as a JSON array.
+        parsed = {key: data[key] for key in data}
+        if 'tags' in data:
+            parsed['tags'] = data.getlist('tags')
+        if 'ingredients' in data:
+            try:
+                parsed['ingredients'] = json.loads(data['ingredients'])
+            except ValueError:
+                raise ValidationError(
+                    {'ingredients': ['Ingredients must be a JSON array!']}
+                )
+        return parsed
+
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self.parse_form(data)
+        return super().to_internal_value(data)
 
-    def run_validation(self, data=empty):
-        try:
-            return super().run_validation(data)
-        except Exception as error:
-            ingredients = data.get('ingredients', None)
-            if ingredients:
-                # Deleting orphans which created
-                # in IngredientsRelatedField's to_internal_value() method.
-                for ingredient in ingredients:
-                    IngredientRecipe.objects.filter(
-                        ingredient_id=ingredient['id'],
-                        amount=ingredient['amount'],
-                        recipe=None,
-                    ).delete()
-            raise error
+    @staticmethod
+    def validate_image(image):
+        if image.size > settings.FILE_UPLOAD_MAX_SIZE:
+            raise ValidationError('Image is too large!')
+        return image
 
     @staticmethod
     def validate_ingredients(ingredients):
-        ingredient_ids = list()
-        for ingredient_recipe in ingredients:
-            ingredient_id = ingredient_recipe.ingredient.id
-            if ingredient_id in ingredient_ids:
-                raise ValidationError('Two identical ingredients found!')
-            ingredient_ids.append(ingredient_id)
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise ValidationError('Two identical ingredients found!')
+        existing = set(Ingredient.objects.filter(id__in=ingredient_ids)
+                       .values_list('id', flat=True))
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in existing:
+                raise ValidationError(f'Ingredient with `id=={ingredient_id}`'
+                                      ' not exists!')
         return ingredients
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+MAX_RECIPE_IDS = 100
+# Ids are bigint, larger values do not fit into SQL parameters.
+MAX_RECIPE_ID = 2 ** 63 - 1
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1,
+                                       max_value=MAX_RECIPE_ID),
+        allow_empty=False,
+        max_length=MAX_RECIPE_IDS,
+    )
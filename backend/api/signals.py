@@ -0,0 +1,82 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (Favorite, Ingredient, IngredientRecipe,
+                            MeasurementUnit, Recipe, ShoppingCart, Tag)
+from recipes.subscriptions import subscriptions_changed
+from recipes.user_recipes import user_recipes_changed
+from users.models import Subscription, User
+
+from .ingredient_index import INGREDIENTS_VERSION
+from .paginations import COUNTS_VERSION
+from .recipe_fragments import (RECIPE_FRAGMENTS_VERSION,
+                               invalidate_recipe_fragments)
+from .snapshots import TAGS_VERSION
+from .utils import bump_cache_version
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=MeasurementUnit)
+def ingredients_changed(**kwargs):
+    bump_cache_version(INGREDIENTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tags_changed(**kwargs):
+    bump_cache_version(TAGS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+@receiver([post_save, post_delete], sender=Subscription)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(user_recipes_changed)
+@receiver(subscriptions_changed)
+def counts_changed(**kwargs):
+    bump_cache_version(COUNTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=User)
+def users_count_changed(created=True, **kwargs):
+    # Only new and deleted users change the count,
+    # post_delete has no `created` argument.
+    if created:
+        bump_cache_version(COUNTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=MeasurementUnit)
+def recipe_fragments_changed(**kwargs):
+    bump_cache_version(RECIPE_FRAGMENTS_VERSION)
+
+
+@receiver(post_save, sender=User)
+def author_changed(created, update_fields, **kwargs):
+    # Logging in updates only `last_login` which is not shown in recipes.
+    if not created and update_fields != frozenset(['last_login']):
+        bump_cache_version(RECIPE_FRAGMENTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    invalidate_recipe_fragments([instance.id])
+
+
+@receiver([post_save, post_delete], sender=IngredientRecipe)
+def recipe_ingredients_changed(instance, **kwargs):
+    if instance.recipe_id is not None:
+        invalidate_recipe_fragments([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe_fragments([instance.id])
+    elif pk_set is None:
+        bump_cache_version(RECIPE_FRAGMENTS_VERSION)
+    else:
+        invalidate_recipe_fragments(pk_set)
@@ -0,0 +1,53 @@
+from hashlib import sha256
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .utils import can_be_cached, get_cache_version
+
+CACHE_CONTROL = 'public, max-age=60'
+TAGS_VERSION = 'tags'
+
+_snapshots = dict()
+
+
+class Snapshot:
+    def __init__(self, data, version=None):
+        self.data = data
+        self.version = version
+        self.content = JSONRenderer().render(data)
+        self.digest = sha256(self.content).hexdigest()
+
+    def get_etag(self, media_type):
+        # JSON and the browsable API are different representations.
+        key = f'{self.digest}:{media_type}'.encode()
+        return f'"{sha256(key).hexdigest()}"'
+
+    def get_headers(self, media_type):
+        return {'ETag': self.get_etag(media_type),
+                'Cache-Control': CACHE_CONTROL}
+
+
+class SnapshotResponse(Response):
+    def __init__(self, snapshot, media_type, **kwargs):
+        super().__init__(snapshot.data,
+                         headers=snapshot.get_headers(media_type), **kwargs)
+        self.snapshot = snapshot
+
+    @property
+    def rendered_content(self):
+        if type(getattr(self, 'accepted_renderer', None)) is JSONRenderer:
+            self['Content-Type'] = 'application/json'
+            return self.snapshot.content
+        return super().rendered_content
+
+
+def get_snapshot(name, get_data):
+    version = get_cache_version(name)
+    snapshot = _snapshots.get(name)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    snapshot = Snapshot(get_data(), version)
+    if can_be_cached():
+        _snapshots[name] = snapshot
+    return snapshot
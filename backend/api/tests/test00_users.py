@@ -6,6 +6,7 @@ import unittest
 from rest_framework import status
 from rest_framework.test import APITestCase, override_settings
 
+from recipes.models import Recipe
 from users.models import User
 
 TEST_FIXTURES_DIR = 'api/tests/fixtures'
@@ -18,6 +19,7 @@ FIXTURES = [
     f'{TEST_FIXTURES_DIR}/test_tag.json',
     f'{TEST_FIXTURES_DIR}/test_recipe.json',
     f'{TEST_FIXTURES_DIR}/test_shopping_cart.json',
+    f'{TEST_FIXTURES_DIR}/test_shopping_list_item.json',
     f'{TEST_FIXTURES_DIR}/test_favorite.json',
 ]
 MEDIA_ROOT = tempfile.mkdtemp()
@@ -336,9 +338,41 @@ class UsersGETSubscriptionsTests(APITestCase):
         self.assertLessEqual(len(response.data['results'][0]['recipes']),
                              recipes_limit)
 
+    def test_get_subscriptions_latest_recipes(self):
+        for recipes_limit in [1, 2, 0]:
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.client.get(
+                    f'{self.url}?recipes_limit={recipes_limit}'
+                )
+                for author in response.data['results']:
+                    recipes = list(
+                        Recipe.objects.filter(author_id=author['id'])
+                        .values_list('id', flat=True)
+                    )
+                    if recipes_limit:
+                        recipes = recipes[:recipes_limit]
+                    self.assertEqual(
+                        [recipe['id'] for recipe in author['recipes']],
+                        recipes
+                    )
+
+    def test_get_subscriptions_queries(self):
+        # Count, authors and recipes of all the authors.
+        with self.assertNumQueries(3):
+            self.client.get(f'{self.url}?recipes_limit=1')
+
+    def test_get_subscriptions_invalid_recipes_limit(self):
+        for recipes_limit in ['a', '-1']:
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.client.get(
+                    f'{self.url}?recipes_limit={recipes_limit}'
+                )
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
     def test_get_subscriptions_result_recipes_keys(self):
         response_list = self.client.get(self.url)
-        keys = ['id', 'name', 'image', 'cooking_time']
+        keys = ['id', 'name', 'image', 'image_variants', 'cooking_time']
         self.assertCountEqual(
             response_list.data['results'][0]['recipes'][0].keys(),
             keys
@@ -400,6 +434,22 @@ class UsersPOSTSubscriptionsTests(APITestCase):
         response = self.client.post(self.author_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_subscribe_queries(self):
+        followers_count = self.non_author.followers_count
+        # Author with recipes, savepoint, insert, counter, release.
+        with self.assertNumQueries(6):
+            response = self.client.post(f'{self.non_author_url}'
+                                        '?recipes_limit=1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['is_subscribed'])
+        self.assertLessEqual(len(response.data['recipes']), 1)
+        self.non_author.refresh_from_db()
+        self.assertEqual(self.non_author.followers_count, followers_count + 1)
+
+    def test_subscribe_non_exists_author(self):
+        response = self.client.post(f'{self.URL}9999/subscribe/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_subscribe_non_auth(self):
         self.client.logout()
         response = self.client.post(self.non_author_url)
@@ -442,6 +492,16 @@ class UsersDELETESubscriptionsTests(APITestCase):
         response = self.client.delete(self.non_author_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_delete_subscription_counter(self):
+        followers_count = self.author.followers_count
+        self.client.delete(self.author_url)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, followers_count - 1)
+
+    def test_delete_non_exists_author(self):
+        response = self.client.delete(f'{self.URL}9999/subscribe/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_delete_subscription_non_auth(self):
         self.client.logout()
         response = self.client.delete(self.author_url)
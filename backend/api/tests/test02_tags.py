@@ -1,7 +1,8 @@
 import json
 
+from django.core.cache import cache
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 
 from recipes.models import Tag
 
@@ -53,6 +54,27 @@ class TagsTests(APITestCase):
                     self.fail(f'Item <{finding_tag}> '
                               'not found in response\'s results!')
 
+    def test_list_etag(self):
+        response = self.client.get(self.URL)
+        self.assertIn('ETag', response)
+        self.assertIn('Cache-Control', response)
+        self.assertEqual(json.loads(response.content), response.data)
+        response = self.client.get(self.URL,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(response.content)
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_depends_on_media_type(self):
+        response = self.client.get(self.URL)
+        self.assertIn('Accept', response['Vary'])
+        html = self.client.get(self.URL, HTTP_ACCEPT='text/html',
+                               HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(html.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(html['ETag'], response['ETag'])
+        self.assertIn('Accept', html['Vary'])
+
     def test_retrieve_result_keys(self):
         tag_id = self.tags[0].id
         response = self.client.get(f'{self.URL}{tag_id}/')
@@ -73,3 +95,25 @@ class TagsTests(APITestCase):
         tag_id = Tag.objects.last().id + 1
         response = self.client.get(f'{self.URL}{tag_id}/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TagsSnapshotTests(APITransactionTestCase):
+    URL = '/api/tags/'
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name='Tag', slug='tag', color='#F0')
+
+    def test_list_without_queries(self):
+        etag = self.client.get(self.URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.URL)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_snapshot_rebuilt_on_change(self):
+        etag = self.client.get(self.URL)['ETag']
+        Tag.objects.create(name='Other', slug='other', color='#F1')
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(json.loads(response.content)), 2)
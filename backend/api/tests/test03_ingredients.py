@@ -1,7 +1,8 @@
 import json
 
+from django.core.cache import cache
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 
 from recipes.models import Ingredient, MeasurementUnit
 
@@ -53,6 +54,14 @@ class IngredientsTests(APITestCase):
                     self.fail(f'Item <{finding_ingred}> '
                               'not found in response\'s results!')
 
+    def test_list_etag(self):
+        response = self.client.get(self.URL)
+        self.assertIn('ETag', response)
+        self.assertEqual(json.loads(response.content), response.data)
+        response = self.client.get(self.URL,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_list_query_param(self):
         ingred = Ingredient.objects.create(name='Bacon',
                                            measurement_unit=self.unit)
@@ -62,6 +71,39 @@ class IngredientsTests(APITestCase):
         self.assertEqual(response.data[0]['name'], ingred.name)
         ingred.delete()
 
+    def test_list_query_param_case_insensitive(self):
+        response = self.client.get(f'{self.URL}?name=INGRED1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data],
+                         ['ingred1'])
+
+    def test_list_query_param_normalized(self):
+        ingred = Ingredient.objects.create(name='Сгущённое  молоко',
+                                           measurement_unit=self.unit)
+        for key in ['сгущен', 'СГУЩЁННОЕ', '  сгущенное молоко']:
+            with self.subTest(key=key):
+                response = self.client.get(f'{self.URL}?name={key}')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual([item['id'] for item in response.data],
+                                 [ingred.id])
+
+    def test_search_query_param_ranking(self):
+        names = ['сгущенное молоко', 'молоко топленое', 'молоко',
+                 'кокосовое молочко', 'яблоко']
+        for name in names:
+            Ingredient.objects.create(name=name, measurement_unit=self.unit)
+        cases = {
+            'молоко': ['молоко', 'молоко топленое', 'сгущенное молоко'],
+            'блоко': ['яблоко'],
+            'малоко': ['молоко', 'молоко топленое'],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                response = self.client.get(f'{self.URL}?search={query}')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                found = [item['name'] for item in response.data]
+                self.assertEqual(found[:len(expected)], expected)
+
     def test_retrieve_result_keys(self):
         ingred_id = self.ingreds[0].id
         response = self.client.get(f'{self.URL}{ingred_id}/')
@@ -83,3 +125,32 @@ class IngredientsTests(APITestCase):
         ingred_id = Ingredient.objects.last().id + 1
         response = self.client.get(f'{self.URL}{ingred_id}/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class IngredientsIndexTests(APITransactionTestCase):
+    URL = '/api/ingredients/'
+
+    def setUp(self):
+        cache.clear()
+        self.unit = MeasurementUnit.objects.create(name='kn')
+        Ingredient.objects.create(name='Bacon', measurement_unit=self.unit)
+
+    def test_query_param_without_queries(self):
+        self.client.get(f'{self.URL}?name=bac')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'{self.URL}?name=bac')
+        self.assertEqual(response.data,
+                         [{'id': Ingredient.objects.get().id,
+                           'name': 'Bacon',
+                           'measurement_unit': 'kn'}])
+
+    def test_index_rebuilt_on_change(self):
+        self.client.get(f'{self.URL}?name=bac')
+        Ingredient.objects.create(name='Bacardi', measurement_unit=self.unit)
+        response = self.client.get(f'{self.URL}?name=bac')
+        self.assertCountEqual([item['name'] for item in response.data],
+                              ['Bacon', 'Bacardi'])
+        self.unit.name = 'kg'
+        self.unit.save()
+        response = self.client.get(f'{self.URL}?name=baco')
+        self.assertEqual(response.data[0]['measurement_unit'], 'kg')
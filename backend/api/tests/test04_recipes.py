@@ -1,11 +1,38 @@
+import base64
+import csv
+import hashlib
+import json
+import os
 import shutil
 import tempfile
-
+from copy import deepcopy
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
 from django.forms.models import model_to_dict
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
-from rest_framework.test import APITestCase, override_settings
-
-from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import (APIRequestFactory, APITestCase,
+                                 APITransactionTestCase, override_settings)
+
+from api.recipe_fragments import (build_fragments, build_fragments_in_database,
+                                  serialize_fragments)
+from api.recipe_json import get_recipe_document_sql
+from api.serializers import RecipeSerializer
+from recipes.feeds import backfill_feed, fan_out_recipe
+from recipes.models import FeedEntry, Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.search import search_postgresql
 from users.models import User
 
 TEST_FIXTURES_DIR = 'api/tests/fixtures'
@@ -18,6 +45,7 @@ FIXTURES = [
     f'{TEST_FIXTURES_DIR}/test_tag.json',
     f'{TEST_FIXTURES_DIR}/test_recipe.json',
     f'{TEST_FIXTURES_DIR}/test_shopping_cart.json',
+    f'{TEST_FIXTURES_DIR}/test_shopping_list_item.json',
     f'{TEST_FIXTURES_DIR}/test_favorite.json',
 ]
 MEDIA_ROOT = tempfile.mkdtemp()
@@ -40,7 +68,7 @@ class RecipesGETTests(APITestCase):
     def test_list_result_keys(self):
         response_list = self.client.get(self.URL)
         keys = ['id', 'author', 'tags', 'name',
-                'text', 'image', 'ingredients',
+                'text', 'image', 'image_variants', 'ingredients',
                 'cooking_time', 'is_favorited', 'is_in_shopping_cart']
         self.assertCountEqual(response_list.data['results'][0].keys(), keys)
 
@@ -105,6 +133,40 @@ class RecipesGETTests(APITestCase):
         self.assertEqual(recipe_name1, recipe_name2,
                          'Query params <page> and <limit> works incorrectly!')
 
+    def test_list_cursor_pagination(self):
+        expected_ids = list(Recipe.objects.order_by('-pub_date', '-id')
+                            .values_list('id', flat=True))
+        response = self.client.get(f'{self.URL}?cursor=&limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(response.data.keys(),
+                              ['next', 'previous', 'results'])
+        self.assertIsNone(response.data['previous'])
+        pages = [response.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+        ids = [item['id'] for page in pages for item in page['results']]
+        self.assertEqual(ids, expected_ids)
+        previous_page = self.client.get(pages[1]['previous']).data
+        self.assertEqual(previous_page['results'], pages[0]['results'])
+
+    def test_list_cursor_pagination_with_filters(self):
+        user = User.objects.get(id=3)
+        user_recipes = list(user.recipes.values_list('id', flat=True))
+        response = self.client.get(
+            f'{self.URL}?cursor=&limit=1&author={user.id}'
+        )
+        ids = list()
+        while True:
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertCountEqual(ids, user_recipes)
+
+    def test_list_cursor_pagination_invalid_cursor(self):
+        response = self.client.get(f'{self.URL}?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_list_query_params(self):
         user = User.objects.get(id=3)
         self.client.force_authenticate(user)
@@ -152,6 +214,40 @@ class RecipesGETTests(APITestCase):
         self.assertCountEqual(response_recipes, tags_recipes,
                               'Query param <tags> works incorrectly!')
 
+    def test_list_name_query_param(self):
+        recipe = Recipe.objects.get(id=3)
+        for key in ['блины', '  Блины   МОЛОЧНЫЕ ', 'блины молочные тонкие']:
+            with self.subTest(key=key):
+                response = self.client.get(f'{self.URL}?name={key}')
+                self.assertEqual(
+                    [item['id'] for item in response.data['results']],
+                    [recipe.id]
+                )
+
+    def test_list_viewer_filters_false(self):
+        user = User.objects.get(id=2)
+        self.client.force_authenticate(user)
+        recipes = Recipe.objects.exclude(favorite__user=user)
+        response = self.client.get(f'{self.URL}?is_favorited=0&limit=100')
+        self.assertCountEqual(
+            [item['id'] for item in response.data['results']],
+            recipes.values_list('id', flat=True)
+        )
+        self.client.logout()
+        response = self.client.get(f'{self.URL}?is_in_shopping_cart=1')
+        self.assertEqual(response.data['count'], 0)
+
+    def test_list_viewer_state_batched(self):
+        user = User.objects.get(id=2)
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.URL)
+        self.assertFalse(any('EXISTS' in query['sql']
+                             for query in context.captured_queries))
+        favorited = set(user.favorite.values_list('recipe_id', flat=True))
+        for item in response.data['results']:
+            self.assertEqual(item['is_favorited'], item['id'] in favorited)
+
     def test_retrieve_status_code(self):
         recipe_id = 3
         response = self.client.get(f'{self.URL}{recipe_id}/')
@@ -166,11 +262,108 @@ class RecipesGETTests(APITestCase):
         recipe_id = 3
         response = self.client.get(f'{self.URL}{recipe_id}/')
         keys = ['id', 'author', 'tags', 'name',
-                'text', 'image', 'ingredients',
+                'text', 'image', 'image_variants', 'ingredients',
                 'cooking_time', 'is_favorited', 'is_in_shopping_cart']
         self.assertCountEqual(response.data.keys(), keys)
 
 
+class RecipesCountCacheTests(APITransactionTestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    def setUp(self):
+        cache.clear()
+
+    def get_count(self, url):
+        with CaptureQueriesContext(connection) as context:
+            count = self.client.get(url).data['count']
+        counted = any('COUNT(' in query['sql']
+                      for query in context.captured_queries)
+        return count, counted
+
+    def test_count_cached(self):
+        count, counted = self.get_count(self.URL)
+        self.assertEqual(count, Recipe.objects.count())
+        self.assertTrue(counted)
+        self.assertEqual(self.get_count(self.URL), (count, False))
+        self.assertEqual(self.get_count(f'{self.URL}?author=3')[1], True)
+
+    def test_count_invalidated(self):
+        count, _ = self.get_count(self.URL)
+        Recipe.objects.filter(id=1).delete()
+        self.assertEqual(self.get_count(self.URL), (count - 1, True))
+
+
+class RecipesFragmentCacheTests(APITransactionTestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    def setUp(self):
+        cache.clear()
+
+    def get_tables(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        return response, [table for table in ['recipes_tag',
+                                              'recipes_ingredientrecipe',
+                                              'users_user']
+                          if table in sql]
+
+    def test_fragments_cached(self):
+        response, tables = self.get_tables(self.URL)
+        self.assertTrue(tables)
+        cached_response, tables = self.get_tables(self.URL)
+        self.assertEqual(tables, [])
+        self.assertEqual(cached_response.content, response.content)
+        _, tables = self.get_tables(f'{self.URL}3/')
+        self.assertEqual(tables, [])
+
+    def test_viewer_overlay(self):
+        self.client.get(self.URL)
+        user = User.objects.get(id=2)
+        self.client.force_authenticate(user)
+        favorites = set(user.favorite.values_list('recipe_id', flat=True))
+        carts = set(user.shopping_cart.values_list('recipe_id', flat=True))
+        authors = set(user.follower.values_list('author_id', flat=True))
+        response = self.client.get(f'{self.URL}?limit=100')
+        for recipe in response.data['results']:
+            self.assertEqual(recipe['is_favorited'], recipe['id'] in favorites)
+            self.assertEqual(recipe['is_in_shopping_cart'],
+                             recipe['id'] in carts)
+            self.assertEqual(recipe['author']['is_subscribed'],
+                             recipe['author']['id'] in authors)
+
+    @override_settings(MEDIA_URL='/media/')
+    def test_fragments_image_urls_per_host(self):
+        self.client.get(f'{self.URL}3/', HTTP_HOST='internal')
+        response = self.client.get(f'{self.URL}3/',
+                                   HTTP_HOST='public.example.org')
+        self.assertTrue(response.data['image'].startswith(
+            'http://public.example.org/'
+        ))
+
+    def test_fragments_invalidated(self):
+        self.client.get(self.URL)
+        tag = Tag.objects.get(slug='breakfast')
+        tag.name = 'Завтрак!'
+        tag.save()
+        recipe = Recipe.objects.get(id=3)
+        recipe.name = 'Блины'
+        recipe.save()
+        recipe.ingredient_recipe.update(amount=1000)
+        recipe.ingredient_recipe.first().save()
+        response = self.client.get(f'{self.URL}3/')
+        self.assertEqual(response.data['name'], 'Блины')
+        self.assertIn(1000, [item['amount']
+                             for item in response.data['ingredients']])
+        response = self.client.get(f'{self.URL}?tags=breakfast')
+        self.assertEqual(response.data['results'][0]['tags'][0]['name'],
+                         'Завтрак!')
+
+
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class RecipesPOSTTests(APITestCase):
     fixtures = FIXTURES
@@ -260,6 +453,38 @@ class RecipesPOSTTests(APITestCase):
         self.client.logout()
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_adding_recipe_ingredients(self):
+        user = User.objects.get(id=3)
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.URL, data=self.RECIPE_DATA)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        inserts = [query['sql'] for query in context.captured_queries
+                   if query['sql'].startswith('INSERT INTO '
+                                              '"recipes_ingredientrecipe"')]
+        self.assertEqual(len(inserts), 1)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        self.assertCountEqual(
+            recipe.ingredient_recipe.values_list('ingredient_id', 'amount'),
+            [(item['id'], item['amount'])
+             for item in self.RECIPE_DATA['ingredients']]
+        )
+
+    def test_invalid_recipe_writes_nothing(self):
+        user = User.objects.get(id=3)
+        self.client.force_authenticate(user)
+        data = self.RECIPE_DATA.copy()
+        data['ingredients'] = [{'id': 1, 'amount': 5},
+                               {'id': Ingredient.objects.latest('id').id + 1,
+                                'amount': 5}]
+        count = IngredientRecipe.objects.count()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.URL, data=data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(IngredientRecipe.objects.count(), count)
+        self.assertFalse([query for query in context.captured_queries
+                          if not query['sql'].startswith('SELECT')])
+
     def test_adding_recipe_fields_length_error(self):
         user = User.objects.get(id=3)
         self.client.force_authenticate(user)
@@ -274,6 +499,201 @@ class RecipesPOSTTests(APITestCase):
         self.client.logout()
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipesMultipartTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.get(id=3))
+        content = base64.b64decode(
+            RecipesPOSTTests.RECIPE_DATA['image'].split(',')[1]
+        )
+        self.data = {
+            'name': 'recipe1',
+            'text': 'some text',
+            'tags': [1, 3],
+            'ingredients': json.dumps(
+                RecipesPOSTTests.RECIPE_DATA['ingredients']
+            ),
+            'cooking_time': 5,
+            'image': SimpleUploadedFile('image.png', content,
+                                        content_type='image/png'),
+        }
+
+    def test_adding_recipe_multipart(self):
+        response = self.client.post(self.URL, data=self.data,
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED,
+                         msg=response.data)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        self.assertCountEqual(recipe.tags.values_list('id', flat=True),
+                              [1, 3])
+        self.assertEqual(recipe.ingredient_recipe.count(), 2)
+        self.assertTrue(recipe.image.storage.exists(recipe.image.name))
+
+    def test_invalid_ingredients_multipart(self):
+        self.data['ingredients'] = '[{"id": 1,'
+        response = self.client.post(self.URL, data=self.data,
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertCountEqual(response.data.keys(), ['ingredients'])
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=32)
+    def test_upload_size_limit(self):
+        response = self.client.post(self.URL, data=self.data,
+                                    format='multipart')
+        self.assertEqual(response.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        response = self.client.post(self.URL,
+                                    data=RecipesPOSTTests.RECIPE_DATA)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertCountEqual(response.data.keys(), ['image'])
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=32)
+    def test_admin_upload_not_limited_by_api_handler(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.org',
+                                              'password')
+        self.client.force_login(admin)
+        response = self.client.post('/admin/recipes/recipe/add/',
+                                    data={'image': self.data['image']},
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.context['adminform'].form.errors)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipesImageVariantsTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @staticmethod
+    def make_image(width, height):
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera'
+        buffer = BytesIO()
+        image = Image.new('RGB', (width, height), 'red')
+        image.save(buffer, 'JPEG', exif=exif)
+        return ('data:image/jpeg;base64,'
+                + base64.b64encode(buffer.getvalue()).decode())
+
+    def test_variants_created(self):
+        self.client.force_authenticate(User.objects.get(id=3))
+        data = dict(RecipesPOSTTests.RECIPE_DATA,
+                    image=self.make_image(700, 350))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.URL, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['image_variants'])
+
+        response = self.client.get(f'{self.URL}{response.data["id"]}/')
+        image_variants = response.data['image_variants']
+        self.assertTrue(image_variants['placeholder']
+                        .startswith('data:image/jpeg;base64,'))
+        self.assertEqual([variant['width']
+                          for variant in image_variants['variants']],
+                         [320, 640])
+        recipe = Recipe.objects.get(id=response.data['id'])
+        storage = recipe.image.storage
+        for variant in recipe.image_variants['variants']:
+            self.assertTrue(variant['webp'].endswith('.webp'))
+            with storage.open(variant['jpeg']) as file:
+                image = Image.open(file)
+                self.assertEqual(image.width, variant['width'])
+                self.assertFalse(image.getexif())
+
+    def test_variants_reset_on_new_image(self):
+        recipe = Recipe.objects.get(id=1)
+        recipe.image_variants = {'placeholder': '', 'variants': []}
+        recipe.save()
+        self.client.force_authenticate(recipe.author)
+        data = dict(RecipesPOSTTests.RECIPE_DATA,
+                    image=self.make_image(10, 10))
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.patch(f'{self.URL}{recipe.id}/', data=data)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, {})
+
+    def test_process_recipe_images_command(self):
+        Recipe.objects.exclude(id=1).delete()
+        recipe = Recipe.objects.get(id=1)
+        default_storage.save(
+            recipe.image.name,
+            ContentFile(base64.b64decode(
+                self.make_image(100, 50).split(',')[1]
+            ))
+        )
+        call_command('process_recipe_images', stdout=StringIO())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants['variants'][0]['width'], 100)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipesImageStorageTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.get(id=3))
+
+    def create_recipe(self, image):
+        data = dict(RecipesPOSTTests.RECIPE_DATA, image=image)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.URL, data=data)
+        return Recipe.objects.get(id=response.data['id'])
+
+    def test_identical_images_stored_once(self):
+        image = RecipesImageVariantsTests.make_image(400, 200)
+        first = self.create_recipe(image)
+        second = self.create_recipe(image)
+        content = base64.b64decode(image.split(',')[1])
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name,
+                         f'recipes/{hashlib.sha256(content).hexdigest()}.jpeg')
+        self.assertEqual(first.image_variants, second.image_variants)
+        _, files = default_storage.listdir('recipes')
+        self.assertEqual(files, [os.path.basename(first.image.name)])
+
+    def test_unused_image_collected(self):
+        shared = RecipesImageVariantsTests.make_image(400, 200)
+        first = self.create_recipe(shared)
+        second = self.create_recipe(shared)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'{self.URL}{first.id}/')
+        call_command('collect_garbage', grace_minutes=0, stdout=StringIO())
+        self.assertTrue(default_storage.exists(second.image.name))
+
+        data = dict(RecipesPOSTTests.RECIPE_DATA,
+                    image=RecipesImageVariantsTests.make_image(300, 300))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'{self.URL}{second.id}/', data=data)
+        # Files are only removed by the garbage collector.
+        self.assertTrue(default_storage.exists(second.image.name))
+        call_command('collect_garbage', grace_minutes=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(second.image.name))
+        self.assertFalse(default_storage.exists(
+            second.image_variants['variants'][0]['webp']
+        ))
+
+
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class RecipesPATCHTests(APITestCase):
     fixtures = FIXTURES
@@ -327,6 +747,41 @@ class RecipesPATCHTests(APITestCase):
                          self.recipe_changed_data['cooking_time'])
         self.recipe.save()
 
+    def get_writes(self, data):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query['sql'].split(' ')[0]
+                for query in context.captured_queries
+                if 'recipes_ingredientrecipe' in query['sql']
+                and not query['sql'].startswith('SELECT')]
+
+    def test_change_recipe_applies_difference(self):
+        data = deepcopy(self.recipe_changed_data)
+        self.client.patch(self.url, data=data)
+        self.assertEqual(self.get_writes(data), [])
+
+        data['ingredients'][0]['amount'] += 1
+        self.assertEqual(self.get_writes(data), ['UPDATE'])
+
+        removed = data['ingredients'].pop()
+        self.assertEqual(self.get_writes(data), ['DELETE'])
+
+        data['ingredients'].append(removed)
+        self.assertEqual(self.get_writes(data), ['INSERT'])
+        self.assertCountEqual(
+            self.recipe.ingredient_recipe.values_list('ingredient_id',
+                                                      'amount'),
+            [(item['id'], item['amount']) for item in data['ingredients']]
+        )
+
+    def test_change_recipe_same_image(self):
+        self.client.patch(self.url, data=self.recipe_changed_data)
+        image = Recipe.objects.get(id=self.recipe.id).image.name
+        self.client.patch(self.url, data=self.recipe_changed_data)
+        self.assertEqual(Recipe.objects.get(id=self.recipe.id).image.name,
+                         image)
+
     def test_change_recipe_non_auth(self):
         self.client.logout()
         response = self.client.patch(self.url, data=self.recipe_changed_data)
@@ -466,6 +921,24 @@ class RecipesPOSTShoppingCartTests(APITestCase):
         response = self.client.post(self.sc_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_add_recipe_to_shopping_cart_queries(self):
+        in_carts_count = self.non_sc_recipe.in_carts_count
+        # Recipe, savepoint, insert, counter, ingredient amounts,
+        # shopping list, release.
+        with self.assertNumQueries(7):
+            response = self.client.post(self.non_sc_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.non_sc_recipe.refresh_from_db()
+        self.assertEqual(self.non_sc_recipe.in_carts_count,
+                         in_carts_count + 1)
+        with self.assertNumQueries(4):
+            response = self.client.post(self.non_sc_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_add_non_exists_recipe_to_shopping_cart(self):
+        response = self.client.post(f'{self.URL}9999/shopping_cart/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_add_recipe_to_shopping_cart_non_auth(self):
         self.client.logout()
         response = self.client.post(self.non_sc_url)
@@ -508,6 +981,16 @@ class RecipesDELETEShoppingCartTests(APITestCase):
         response = self.client.delete(self.non_sc_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_delete_recipe_from_shopping_cart_counter(self):
+        in_carts_count = self.sc_recipe.in_carts_count
+        self.client.delete(self.sc_url)
+        self.sc_recipe.refresh_from_db()
+        self.assertEqual(self.sc_recipe.in_carts_count, in_carts_count - 1)
+
+    def test_delete_non_exists_recipe(self):
+        response = self.client.delete(f'{self.URL}9999/shopping_cart/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_delete_recipe_from_shopping_cart_non_auth(self):
         self.client.logout()
         response = self.client.delete(self.sc_url)
@@ -537,11 +1020,103 @@ class RecipesGETShoppingCartTests(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_shopping_cart_content(self):
+        totals = dict()
+        for ingredient_recipe in IngredientRecipe.objects.filter(
+                recipe__shopping_cart__user=self.user):
+            ingredient = ingredient_recipe.ingredient
+            line = (ingredient.name, ingredient.measurement_unit.name)
+            totals[line] = totals.get(line, 0) + ingredient_recipe.amount
+        self.assertTrue(totals)
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[2:-2], sorted(
+            f'{name} - {amount} {unit}'
+            for (name, unit), amount in totals.items()
+        ))
+
     def test_get_shopping_cart_non_auth(self):
         self.client.logout()
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def get_totals(self):
+        return {(item.ingredient.name,
+                 item.ingredient.measurement_unit.name): item.total_amount
+                for item in self.user.shopping_list.all()}
+
+    def test_shopping_cart_csv(self):
+        response = self.client.get(f'{self.url}?format=csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('.csv"', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], ['name', 'measurement_unit', 'amount'])
+        self.assertEqual(
+            {(name, unit): int(amount) for name, unit, amount in rows[1:]},
+            self.get_totals()
+        )
+
+    def test_shopping_cart_json(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        items = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            {(item['name'], item['measurement_unit']): item['amount']
+             for item in items},
+            self.get_totals()
+        )
+        self.assertEqual(
+            items,
+            self.client.get(f'{self.URL}shopping_list/').json()
+        )
+
+    def test_empty_shopping_cart_json(self):
+        self.user.shopping_cart.all().delete()
+        response = self.client.get(f'{self.url}?format=json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+    def test_shopping_cart_pdf(self):
+        cache.clear()
+        response = self.client.get(f'{self.url}?format=pdf')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        with patch('api.views.recipe.run_in_background') as run:
+            cached = self.client.get(f'{self.url}?format=pdf')
+        run.assert_not_called()
+        self.assertEqual(cached.content, response.content)
+
+    def test_shopping_cart_pdf_is_generating(self):
+        cache.clear()
+        with patch('api.views.recipe.run_in_background') as run:
+            response = self.client.get(f'{self.url}?format=pdf')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertIn('Retry-After', response)
+            run.assert_called_once()
+            response = self.client.get(f'{self.url}?format=pdf')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            run.assert_called_once()
+
+    def test_shopping_cart_pdf_changes_with_cart(self):
+        cache.clear()
+        self.client.get(f'{self.url}?format=pdf')
+        self.user.shopping_cart.first().delete()
+        with patch('api.views.recipe.run_in_background') as run:
+            self.client.get(f'{self.url}?format=pdf')
+        run.assert_called_once()
+
+    def test_shopping_cart_error_format(self):
+        self.client.logout()
+        response = self.client.get(f'{self.url}?format=csv')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+
 
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class RecipesPOSTFavoriteTests(APITestCase):
@@ -578,6 +1153,13 @@ class RecipesPOSTFavoriteTests(APITestCase):
         keys = ['id', 'name', 'image', 'cooking_time']
         self.assertCountEqual(response.data.keys(), keys)
 
+    def test_add_recipe_to_favorite_counter(self):
+        favorites_count = self.non_favorite_recipe.favorites_count
+        self.client.post(self.non_favorite_url)
+        self.non_favorite_recipe.refresh_from_db()
+        self.assertEqual(self.non_favorite_recipe.favorites_count,
+                         favorites_count + 1)
+
     def test_add_exists_recipe_to_favorite(self):
         response = self.client.post(self.favorite_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -621,6 +1203,13 @@ class RecipesDELETEFavoriteTests(APITestCase):
             .exists()
         )
 
+    def test_delete_recipe_from_favorite_counter(self):
+        favorites_count = self.favorite_recipe.favorites_count
+        self.client.delete(self.favorite_url)
+        self.favorite_recipe.refresh_from_db()
+        self.assertEqual(self.favorite_recipe.favorites_count,
+                         favorites_count - 1)
+
     def test_delete_non_exists_recipe_from_favorite(self):
         response = self.client.delete(self.non_favorite_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -629,3 +1218,464 @@ class RecipesDELETEFavoriteTests(APITestCase):
         self.client.logout()
         response = self.client.delete(self.favorite_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RecipesFragmentBuilderTests(APITestCase):
+    fixtures = FIXTURES
+
+    def test_flat_builder_matches_serializer(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        renderer = JSONRenderer()
+        expected = serialize_fragments(recipe_ids, request)
+        built = build_fragments(recipe_ids, request)
+        self.assertEqual(
+            renderer.render([built[pk] for pk in recipe_ids]),
+            renderer.render([expected[pk] for pk in recipe_ids])
+        )
+
+    def test_database_builder_matches_serializer(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        renderer = JSONRenderer()
+        expected = serialize_fragments(recipe_ids, request)
+        with self.assertNumQueries(1):
+            built = build_fragments_in_database(recipe_ids, request)
+        self.assertEqual(
+            renderer.render([built[pk] for pk in recipe_ids]),
+            renderer.render([expected[pk] for pk in recipe_ids])
+        )
+
+    def test_postgresql_orders_inside_aggregates(self):
+        sql = ' '.join(get_recipe_document_sql('postgresql', 2).split())
+        self.assertIn('ORDER BY t.slug), \'[]\')', sql)
+        self.assertIn('ORDER BY i.name, i.id), \'[]\')', sql)
+        self.assertNotIn('AS document', sql)
+        self.assertIn('WHERE r.id IN (%s, %s)', sql)
+
+    @override_settings(RECIPE_JSON_IN_DATABASE=True)
+    def test_list_with_database_builder(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']),
+                         Recipe.objects.count())
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_recipe_serialization', repeat=2, stdout=out)
+        self.assertIn('flat', out.getvalue())
+
+
+class RecipesCountersTests(APITestCase):
+    fixtures = FIXTURES
+
+    def assertCountersValid(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.favorites_count, recipe.favorite.count())
+            self.assertEqual(recipe.in_carts_count,
+                             recipe.shopping_cart.count())
+        for user in User.objects.all():
+            self.assertEqual(user.recipes_count, user.recipes.count())
+            self.assertEqual(user.followers_count, user.following.count())
+
+    def test_counters_maintained(self):
+        user = User.objects.get(id=4)
+        recipe = Recipe.objects.get(id=1)
+        recipe.shopping_cart.create(user=user)
+        user.following.all().delete()
+        User.objects.get(id=2).recipes.all().delete()
+        self.assertCountersValid()
+
+    def test_saves_keep_concurrent_counter_changes(self):
+        recipe = Recipe.objects.get(id=1)
+        author = User.objects.get(id=recipe.author_id)
+        favorites_count = recipe.favorites_count
+        followers_count = author.followers_count
+        reader = User.objects.exclude(
+            id__in=recipe.favorite.values('user_id')
+        ).exclude(id__in=author.following.values('user_id')).first()
+        recipe.favorite.create(user=reader)
+        author.following.create(user=reader)
+        serializer = RecipeSerializer(
+            recipe, data={'name': 'Другое название'}, partial=True,
+            context={'request': APIRequestFactory().patch('/')}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        author.first_name = 'Другое имя'
+        author.save()
+        recipe.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(recipe.name, 'Другое название')
+        self.assertEqual(recipe.favorites_count, favorites_count + 1)
+        self.assertEqual(author.first_name, 'Другое имя')
+        self.assertEqual(author.followers_count, followers_count + 1)
+
+    def test_reconcile_counters(self):
+        Recipe.objects.update(favorites_count=100)
+        User.objects.filter(id=3).update(recipes_count=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCountersValid()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipesGarbageTests(APITestCase):
+    fixtures = FIXTURES
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_collect_garbage(self):
+        IngredientRecipe.objects.create(ingredient_id=1, amount=1)
+        IngredientRecipe.objects.create(ingredient_id=2, amount=1)
+        recipe = Recipe.objects.get(id=1)
+        storage = default_storage
+        storage.save(recipe.image.name, ContentFile(b'image'))
+        storage.save('recipes/old.jpg', ContentFile(b'old image'))
+
+        out = StringIO()
+        call_command('collect_garbage', grace_minutes=0, batch_size=1,
+                     stdout=out)
+        self.assertIn('Deleted 2 orphan ingredient rows', out.getvalue())
+        self.assertIn('Deleted 1 images, 9 bytes', out.getvalue())
+        self.assertFalse(
+            IngredientRecipe.objects.filter(recipe__isnull=True).exists()
+        )
+        self.assertTrue(storage.exists(recipe.image.name))
+        self.assertFalse(storage.exists('recipes/old.jpg'))
+
+    def test_collect_garbage_grace_period(self):
+        storage = default_storage
+        storage.save('recipes/new.jpg', ContentFile(b'new image'))
+        call_command('collect_garbage', stdout=StringIO())
+        self.assertTrue(storage.exists('recipes/new.jpg'))
+
+    def test_collect_garbage_reused_image(self):
+        storage = Recipe._meta.get_field('image').storage
+        name = storage.save('recipes/reused.jpg', ContentFile(b'reused'))
+        past = (timezone.now() - timedelta(days=1)).timestamp()
+        os.utime(storage.path(name), (past, past))
+        self.assertEqual(
+            storage.save('recipes/again.jpg', ContentFile(b'reused')), name
+        )
+        call_command('collect_garbage', stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+
+
+class RecipesShoppingListTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    def setUp(self):
+        self.user = User.objects.get(id=2)
+        self.client.force_authenticate(self.user)
+
+    def assertShoppingListValid(self):
+        totals = dict()
+        for ingredient_recipe in IngredientRecipe.objects.filter(
+                recipe__shopping_cart__user=self.user):
+            ingredient_id = ingredient_recipe.ingredient_id
+            totals[ingredient_id] = (totals.get(ingredient_id, 0)
+                                     + ingredient_recipe.amount)
+        self.assertEqual(
+            dict(self.user.shopping_list
+                 .values_list('ingredient_id', 'total_amount')),
+            totals
+        )
+
+    def test_shopping_list_endpoint(self):
+        response = self.client.get(f'{self.URL}shopping_list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(response.data[0].keys(),
+                              ['id', 'name', 'measurement_unit', 'amount'])
+        self.assertEqual(
+            {item['id']: item['amount'] for item in response.data},
+            dict(self.user.shopping_list
+                 .values_list('ingredient_id', 'total_amount'))
+        )
+        self.client.logout()
+        response = self.client.get(f'{self.URL}shopping_list/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_shopping_list_maintained(self):
+        self.assertShoppingListValid()
+        self.client.post(f'{self.URL}1/shopping_cart/')
+        self.client.post(f'{self.URL}2/shopping_cart/')
+        self.assertShoppingListValid()
+        self.client.delete(f'{self.URL}3/shopping_cart/')
+        self.assertShoppingListValid()
+
+        recipe = Recipe.objects.get(id=1)
+        self.client.force_authenticate(recipe.author)
+        data = dict(RecipesPOSTTests.RECIPE_DATA,
+                    ingredients=[{'id': 1, 'amount': 50},
+                                 {'id': 2, 'amount': 3}])
+        with self.settings(MEDIA_ROOT=MEDIA_ROOT):
+            response = self.client.patch(f'{self.URL}1/', data=data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertShoppingListValid()
+
+        Recipe.objects.filter(id=2).delete()
+        self.assertShoppingListValid()
+
+    def test_rebuild_shopping_lists(self):
+        self.user.shopping_list.update(total_amount=1)
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assertShoppingListValid()
+
+
+class RecipesBatchUserRecipesTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    def setUp(self):
+        self.user = User.objects.get(id=2)
+        self.client.force_authenticate(self.user)
+
+    def assertShoppingListValid(self):
+        RecipesShoppingListTests.assertShoppingListValid(self)
+
+    def assertCountersValid(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.in_carts_count,
+                             recipe.shopping_cart.count())
+            self.assertEqual(recipe.favorites_count,
+                             recipe.favorite.count())
+
+    def cart(self):
+        return set(self.user.shopping_cart.values_list('recipe_id',
+                                                       flat=True))
+
+    def test_add_to_shopping_cart(self):
+        response = self.client.post(f'{self.URL}shopping_cart/',
+                                    data={'recipes': [1, 2, 3, 9999]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'recipes': [1, 2]})
+        self.assertEqual(self.cart(), {1, 2, 3, 5})
+        self.assertShoppingListValid()
+        self.assertCountersValid()
+
+    def test_remove_from_shopping_cart(self):
+        response = self.client.delete(f'{self.URL}shopping_cart/',
+                                      data={'recipes': [1, 3]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'recipes': [3]})
+        self.assertEqual(self.cart(), {5})
+        self.assertShoppingListValid()
+        self.assertCountersValid()
+
+    def test_clear_shopping_cart(self):
+        response = self.client.delete(f'{self.URL}shopping_cart/clear/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.cart(), set())
+        self.assertFalse(self.user.shopping_list.exists())
+        self.assertCountersValid()
+        response = self.client.delete(f'{self.URL}shopping_cart/clear/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_change_favorites(self):
+        response = self.client.post(f'{self.URL}favorite/',
+                                    data={'recipes': [1, 3]})
+        self.assertEqual(response.data, {'recipes': [1]})
+        response = self.client.delete(f'{self.URL}favorite/',
+                                      data={'recipes': [3, 4, 5]})
+        self.assertEqual(response.data, {'recipes': [3, 4]})
+        self.assertEqual(
+            set(self.user.favorite.values_list('recipe_id', flat=True)),
+            {1}
+        )
+        self.assertCountersValid()
+
+    def test_batch_invalid_data(self):
+        for data in [{}, {'recipes': []}, {'recipes': ['a']},
+                     {'recipes': [2 ** 63]},
+                     {'recipes': list(range(1, 200))}]:
+            with self.subTest(data=data):
+                response = self.client.post(f'{self.URL}shopping_cart/',
+                                            data=data)
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+                self.assertIn('recipes', response.data)
+
+    def test_batch_bigint_ids(self):
+        response = self.client.post(f'{self.URL}favorite/',
+                                    data={'recipes': [2 ** 31, 2 ** 63 - 1]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'recipes': []})
+
+    def test_batch_non_auth(self):
+        self.client.logout()
+        for method, url in [('post', 'shopping_cart/'),
+                            ('delete', 'shopping_cart/'),
+                            ('delete', 'shopping_cart/clear/'),
+                            ('post', 'favorite/')]:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(
+                    f'{self.URL}{url}', data={'recipes': [1]}
+                )
+                self.assertEqual(response.status_code,
+                                 status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipesFeedTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        # Loaded fixtures do not send signals which fill feeds.
+        call_command('rebuild_feeds', stdout=StringIO())
+        cls.user = User.objects.get(id=2)
+        cls.url = f'{cls.URL}feed/'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_feed(self, user):
+        self.client.force_authenticate(user)
+        ids = list()
+        url = f'{self.url}?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def expected_feed(self, user):
+        return list(Recipe.objects.filter(author__following__user=user)
+                    .values_list('id', flat=True))
+
+    def test_feed(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(response.data.keys(),
+                              ['next', 'previous', 'results'])
+        feed = self.get_feed(self.user)
+        self.assertTrue(feed)
+        self.assertEqual(feed, self.expected_feed(self.user))
+
+    def test_feed_representation(self):
+        response = self.client.get(self.url)
+        recipe = response.data['results'][0]
+        self.assertEqual(recipe,
+                         self.client.get(f'{self.URL}{recipe["id"]}/').data)
+
+    def test_new_recipe_fan_out(self):
+        author = User.objects.get(id=3)
+        self.client.force_authenticate(author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.URL,
+                                        data=RecipesPOSTTests.RECIPE_DATA)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        feed = self.get_feed(self.user)
+        self.assertEqual(feed[0], response.data['id'])
+        self.assertEqual(feed, self.expected_feed(self.user))
+
+    def test_subscribe_backfills_and_unsubscribe_prunes(self):
+        user = User.objects.get(id=12)
+        author = User.objects.get(id=3)
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(
+            self.get_feed(user),
+            list(author.recipes.values_list('id', flat=True))
+        )
+        self.client.delete(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(self.get_feed(user), [])
+
+    def test_fan_out_in_batches(self):
+        recipe = Recipe.objects.filter(author__following__isnull=False).first()
+        FeedEntry.objects.filter(recipe=recipe).delete()
+        fan_out_recipe(recipe.id, batch_size=1)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(recipe=recipe)
+                .values_list('user_id', flat=True)),
+            set(recipe.author.following.values_list('user_id', flat=True))
+        )
+
+    def test_backfill_after_unsubscribe(self):
+        backfill_feed(12, 3)
+        self.assertFalse(FeedEntry.objects.filter(user_id=12).exists())
+
+    def test_feed_single_range_scan(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        feed_queries = [query['sql'] for query in queries.captured_queries
+                        if 'recipes_feedentry' in query['sql']]
+        self.assertEqual(len(feed_queries), 1)
+        self.assertNotIn('JOIN', feed_queries[0])
+
+    def test_feed_non_auth(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RecipesSearchTests(APITestCase):
+    fixtures = FIXTURES
+
+    URL = '/api/recipes/'
+
+    def search(self, query, **params):
+        response = self.client.get(self.URL, {'search': query, 'limit': 100,
+                                              **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search(self):
+        self.assertEqual(self.search('хлеб'), [1])
+        self.assertCountEqual(self.search('тщательно'), [2, 3])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_search_ranks_name_matches_first(self):
+        self.assertEqual(self.search('соль'), [5, 3])
+
+    def test_search_normalizes_query(self):
+        # Stop words like «все» are dropped by PostgreSQL only,
+        # so queries here have none of them.
+        self.assertEqual(self.search('ХЛЕБ'), [1])
+        self.assertEqual(self.search('мёдом'), [3])
+
+    def test_search_matches_prefixes(self):
+        self.assertEqual(self.search('ветч'), [1])
+        self.assertEqual(self.search('хлеб ветчин'), [1])
+        self.assertEqual(self.search('хлеб кофе'), [])
+
+    def test_postgresql_prefix_query(self):
+        queryset = search_postgresql(Recipe.objects.all(), ['хлеб', 'все'])
+        # Compiling needs no connection to the server.
+        postgresql = DatabaseWrapper(connection.settings_dict)
+        sql, params = queryset.query.get_compiler(
+            connection=postgresql
+        ).as_sql()
+        self.assertIn('to_tsquery', sql)
+        self.assertIn('хлеб:* & все:*', params)
+
+    def test_search_composes_with_filters(self):
+        self.assertEqual(self.search('соль', author=3), [3])
+        response = self.client.get(self.URL, {'search': 'тщательно',
+                                              'limit': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_search_index_is_maintained(self):
+        recipe = Recipe.objects.get(id=4)
+        recipe.name = 'Запечённый картофель'
+        recipe.save()
+        self.assertEqual(self.search('запеченный'), [4])
+        self.assertEqual(self.search('картошка'), [])
+        Recipe.objects.filter(id=1).delete()
+        self.assertEqual(self.search('хлеб'), [])
@@ -1,8 +1,113 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Exists, OuterRef
 
+from recipes.models import Recipe
 from users.models import Subscription
 
+LATEST_RECIPES_SQL = '''
+SELECT id, author_id, name, image, image_variants, cooking_time
+FROM (
+    SELECT id, author_id, name, image, image_variants, cooking_time,
+           ROW_NUMBER() OVER (
+               PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+           ) AS position
+    FROM {table}
+    WHERE author_id IN ({authors})
+) recipes
+WHERE %s IS NULL OR position <= %s
+ORDER BY author_id, position
+'''
+
 
 def is_subscribed(user_id):
     return Exists(Subscription.objects.filter(author_id=OuterRef('id'),
                                               user_id=user_id))
+
+
+def prefetch_latest_recipes(authors, limit=None):
+    """
+    Sets `latest_recipes` of each author to at most `limit` of their
+    newest recipes, fetched by one query for all the authors.
+    """
+    authors = list(authors)
+    if not authors:
+        return authors
+    sql = LATEST_RECIPES_SQL.format(
+        table=Recipe._meta.db_table,
+        authors=', '.join(['%s'] * len(authors)),
+    )
+    recipes = dict()
+    for recipe in Recipe.objects.raw(
+            sql, [*[author.id for author in authors], limit, limit]):
+        recipes.setdefault(recipe.author_id, []).append(recipe)
+    for author in authors:
+        author.latest_recipes = recipes.get(author.id, [])
+    return authors
+
+
+def get_cache_version(name):
+    return cache.get_or_set(f'{name}_version', lambda: uuid.uuid4().hex,
+                            timeout=None)
+
+
+def bump_cache_version(name):
+    # Readers must not rebuild from the old rows
+    # while the writing transaction is still open.
+    transaction.on_commit(
+        lambda: cache.set(f'{name}_version', uuid.uuid4().hex, timeout=None)
+    )
+
+
+def can_be_cached():
+    # Anything read inside a transaction may be rolled back,
+    # so it must not outlive that transaction.
+    return not transaction.get_connection().in_atomic_block
+
+
+def absolute_url(url, request):
+    if not url or request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def media_url(name, request):
+    if not name:
+        return None
+    return absolute_url(Recipe._meta.get_field('image').storage.url(name),
+                        request)
+
+
+def represent_image_variants(image_variants, request):
+    # Variants are not ready until the worker has processed the image.
+    if not image_variants:
+        return None
+    return {
+        'placeholder': image_variants['placeholder'],
+        'variants': [
+            {'width': variant['width'],
+             'webp': media_url(variant['webp'], request),
+             'jpeg': media_url(variant['jpeg'], request)}
+            for variant in image_variants['variants']
+        ],
+    }
+
+
+def absolute_image_urls(representation, request):
+    """
+    Makes relative image URLs of a recipe representation absolute
+    for the host and scheme of the request.
+    """
+    image_variants = representation['image_variants']
+    if image_variants:
+        image_variants = dict(image_variants, variants=[
+            dict(variant,
+                 webp=absolute_url(variant['webp'], request),
+                 jpeg=absolute_url(variant['jpeg'], request))
+            for variant in image_variants['variants']
+        ])
+    return dict(representation,
+                image=absolute_url(representation['image'], request),
+                image_variants=image_variants)
@@ -1,9 +1,13 @@
 from rest_framework.exceptions import ValidationError
 
 
-def integer_validator(name, value):
+def integer_validator(name, value, min_value=None):
     try:
         value = int(value)
     except ValueError:
         raise ValidationError(f'Value `{name}` must be integer!')
+    if min_value is not None and value < min_value:
+        raise ValidationError(
+            f'Value `{name}` must be integer not less than {min_value}!'
+        )
     return value
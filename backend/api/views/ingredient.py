@@ -1,19 +1,40 @@
 from rest_framework import permissions
+from rest_framework.response import Response
 
 from recipes.models import Ingredient
+from recipes.utils import normalize_name
 
-from ..mixins import ListRetrieveModelViewSet
+from ..ingredient_index import INGREDIENTS_VERSION, get_ingredient_index
+from ..mixins import ListRetrieveModelViewSet, SnapshotListMixin
 from ..serializers import IngredientSerializer
+from ..utils import can_be_cached
 
 
-class IngredientViewSet(ListRetrieveModelViewSet):
+class IngredientViewSet(SnapshotListMixin, ListRetrieveModelViewSet):
     queryset = Ingredient.objects.select_related('measurement_unit').all()
     serializer_class = IngredientSerializer
     http_method_names = ['get']
     permission_classes = [permissions.AllowAny]
+    snapshot_name = INGREDIENTS_VERSION
 
     def get_queryset(self):
         name = self.request.query_params.get('name')
         if name:
-            return Ingredient.objects.filter(name__istartswith=name)
+            return self.queryset.filter(
+                search_name__startswith=normalize_name(name)
+            )
         return self.queryset
+
+    def use_snapshot(self):
+        return not self.request.query_params.get('name')
+
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get('search')
+        if search:
+            return Response(get_ingredient_index().search(search))
+        name = request.query_params.get('name')
+        if name and can_be_cached():
+            return Response(get_ingredient_index().startswith(name))
+        # Inside a transaction the shared index may be stale,
+        # so the indexed search key in the database is used instead.
+        return super().list(request, *args, **kwargs)
@@ -1,33 +1,59 @@
+from django.core.cache import cache
 from django.db.models import Exists, OuterRef, Prefetch
 from django.db.models.expressions import Value
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework
 from rest_framework import permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
 
-from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.models import Favorite, FeedEntry, Recipe, ShoppingCart
+from recipes.user_recipes import add_user_recipes, remove_user_recipes
+from recipes.workers import run_in_background
 from users.models import User
 
 from ..filters import RecipeFilter
-from ..mixins import NonPartialUpdateModelViewSet
-from ..paginations import PageNumberLimitPagination
+from ..mixins import LimitedUploadMixin, NonPartialUpdateModelViewSet
+from ..paginations import (FeedPagination, KeysetPagination,
+                           PageNumberLimitPagination)
 from ..permissions import IsAuthorOrGet
-from ..serializers import RecipeSerializer
+from ..recipe_fragments import represent_recipes
+from ..renderers import (SHOPPING_LIST_RENDERERS, cache_document,
+                         get_document_cache_key)
+from ..serializers import (RecipeIdsSerializer, RecipeSerializer,
+                           ShoppingListItemSerializer)
 from ..utils import is_subscribed
 
+SHORT_FIELDS = ['id', 'name', 'image', 'cooking_time']
+DOCUMENT_LOCK_TIMEOUT = 60
+DOCUMENT_RETRY_AFTER = '1'
 
-class RecipeViewSet(NonPartialUpdateModelViewSet):
+
+class RecipeViewSet(LimitedUploadMixin, NonPartialUpdateModelViewSet):
     serializer_class = RecipeSerializer
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = PageNumberLimitPagination
     filter_backends = [rest_framework.DjangoFilterBackend]
     filterset_class = RecipeFilter
+    parser_classes = [JSONParser, MultiPartParser]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly,
                           IsAuthorOrGet]
 
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and KeysetPagination.cursor_query_param
+                in self.request.query_params):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
     def get_queryset(self):
+        if self.action in ['list', 'retrieve']:
+            # Nested data comes from cached fragments
+            # and viewer state is looked up for the page only.
+            return Recipe.objects.only('id', 'author_id', 'pub_date')
         current_user = self.request.user
         author_prefetch = Prefetch(
             'author',
@@ -54,89 +80,172 @@ class RecipeViewSet(NonPartialUpdateModelViewSet):
                 .annotate(is_favorited=is_favorited)
                 .annotate(is_in_shopping_cart=is_in_shopping_cart))
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(represent_recipes(page, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        return Response(represent_recipes([recipe], request)[0])
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     @staticmethod
-    def gen_shopping_cart_content(recipes):
-        header = ('---------СПИСОК ПОКУПОК---------\n'
-                  '================================\n')
-        footer = ('================================\n'
-                  '-----------FOODGRAM(\u2184)----------')
-        data = dict()
-        for recipe in recipes:
-            for ingredient_recipe in recipe.ingredient_recipe.all():
-                ingredient = ingredient_recipe.ingredient
-                data[ingredient] = (
-                    data.get(ingredient, 0) + ingredient_recipe.amount
-                )
-        body = str()
-        for ingredient, amount in data.items():
-            body += (f'{ingredient.name} - {amount} '
-                     f'{ingredient.measurement_unit.name}\n')
-        return header + body + footer
+    def get_shopping_list(user):
+        return user.shopping_list.order_by('ingredient__name', 'ingredient_id')
+
+    @staticmethod
+    def get_shopping_list_document(renderer, rows, headers):
+        key = get_document_cache_key(renderer, rows)
+        content = cache.get(key)
+        if (content is None
+                and cache.add(f'{key}_lock', True, DOCUMENT_LOCK_TIMEOUT)):
+            run_in_background(cache_document, type(renderer), key, rows)
+            # Ready right away when the document is rendered in this thread.
+            content = cache.get(key)
+        if content is None:
+            data = {'detail': 'The shopping list is being generated.'}
+            return Response(data=data, status=status.HTTP_202_ACCEPTED,
+                            headers={'Retry-After': DOCUMENT_RETRY_AFTER})
+        return HttpResponse(content, content_type=renderer.media_type,
+                            headers=headers)
 
     @action(detail=False, methods=['get'],
             url_path='download_shopping_cart',
+            renderer_classes=SHOPPING_LIST_RENDERERS,
             permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart_action(self, request):
-        recipes = (Recipe.objects.filter(shopping_cart__user=request.user)
-                   .prefetch_related('ingredient_recipe'
-                                     '__ingredient__measurement_unit')
-                   .all())
-        content = self.gen_shopping_cart_content(recipes)
-        filename = f'{request.user.username}_shopping_cart.txt'
+        rows = self.get_shopping_list(request.user).values_list(
+            'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit__name', 'total_amount'
+        )
+        renderer = request.accepted_renderer
+        filename = f'{request.user.username}_shopping_cart.{renderer.format}'
         headers = {
-            'Content-Type': 'text/plain',
             'Content-Disposition': f'attachment; filename="{filename}"',
         }
-        return HttpResponse(content, headers=headers,
-                            status=status.HTTP_200_OK)
+        if not renderer.streaming:
+            return self.get_shopping_list_document(renderer, list(rows),
+                                                   headers)
+        return StreamingHttpResponse(
+            renderer.render_rows(rows.iterator()),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+            headers=headers,
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=['get'],
+            url_path='feed',
+            permission_classes=[permissions.IsAuthenticated])
+    def feed_action(self, request):
+        entries = (FeedEntry.objects.filter(user_id=request.user.id)
+                   .only('recipe', 'author', 'pub_date'))
+        paginator = FeedPagination()
+        page = paginator.paginate_queryset(entries, request, self)
+        # Entries have all the representation needs besides fragments,
+        # so recipes are not joined.
+        recipes = [Recipe(id=entry.recipe_id, author_id=entry.author_id,
+                          pub_date=entry.pub_date) for entry in page]
+        return paginator.get_paginated_response(
+            represent_recipes(recipes, request)
+        )
+
+    @action(detail=False, methods=['get'],
+            url_path='shopping_list',
+            permission_classes=[permissions.IsAuthenticated])
+    def shopping_list_action(self, request):
+        items = (self.get_shopping_list(request.user)
+                 .select_related('ingredient__measurement_unit'))
+        serializer = ShoppingListItemSerializer(items, many=True)
+        return Response(serializer.data)
+
+    @staticmethod
+    def change_user_recipes(request, change, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = change(model, request.user.id,
+                            serializer.validated_data['recipes'])
+        return Response(data={'recipes': sorted(recipe_ids)},
+                        status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'],
+            url_path='shopping_cart',
+            permission_classes=[permissions.IsAuthenticated])
+    def shopping_cart_batch_action(self, request):
+        return self.change_user_recipes(request, add_user_recipes,
+                                        ShoppingCart)
+
+    @shopping_cart_batch_action.mapping.delete
+    def shopping_cart_batch_delete_action(self, request):
+        return self.change_user_recipes(request, remove_user_recipes,
+                                        ShoppingCart)
+
+    @action(detail=False, methods=['delete'],
+            url_path='shopping_cart/clear',
+            permission_classes=[permissions.IsAuthenticated])
+    def shopping_cart_clear_action(self, request):
+        remove_user_recipes(ShoppingCart, request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'],
+            url_path='favorite',
+            permission_classes=[permissions.IsAuthenticated])
+    def favorite_batch_action(self, request):
+        return self.change_user_recipes(request, add_user_recipes, Favorite)
+
+    @favorite_batch_action.mapping.delete
+    def favorite_batch_delete_action(self, request):
+        return self.change_user_recipes(request, remove_user_recipes,
+                                        Favorite)
+
+    def add_user_recipe(self, request, pk, model, error):
+        recipe = get_object_or_404(Recipe.objects.only(*SHORT_FIELDS), id=pk)
+        # The insert does nothing when the recipe is already there,
+        # so concurrent requests cannot violate the unique constraint.
+        if not add_user_recipes(model, request.user.id, [recipe.id]):
+            return Response(data={'errors': error},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(recipe, fields=SHORT_FIELDS)
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def remove_user_recipe(request, pk, model, error):
+        if not remove_user_recipes(model, request.user.id, [pk]):
+            get_object_or_404(Recipe, id=pk)
+            return Response(data={'errors': error},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'],
             url_path='shopping_cart',
             permission_classes=[permissions.IsAuthenticated])
     def shopping_cart_action(self, request, pk):
-        recipe = get_object_or_404(self.get_queryset(), id=pk)
-        if request.user.shopping_cart.filter(recipe_id=pk).exists():
-            data = {'errors': 'Recipe is already in the shopping cart!'}
-            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-        ShoppingCart.objects.create(user=request.user, recipe=recipe)
-        fields = ['id', 'name', 'image', 'cooking_time']
-        serializer = self.get_serializer(recipe, fields=fields)
-        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+        return self.add_user_recipe(
+            request, pk, ShoppingCart,
+            'Recipe is already in the shopping cart!'
+        )
 
     @shopping_cart_action.mapping.delete
     def shopping_cart_delete_action(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        shopping_cart = ShoppingCart.objects.filter(user_id=request.user.id,
-                                                    recipe_id=recipe.id)
-        if not shopping_cart.exists():
-            data = {'errors': 'Recipe is not in the shopping cart!'}
-            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-        shopping_cart.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.remove_user_recipe(
+            request, pk, ShoppingCart,
+            'Recipe is not in the shopping cart!'
+        )
 
     @action(detail=True, methods=['post'],
             url_path='favorite',
             permission_classes=[permissions.IsAuthenticated])
     def favorite_action(self, request, pk):
-        recipe = get_object_or_404(self.get_queryset(), id=pk)
-        if request.user.favorite.filter(recipe_id=pk).exists():
-            data = {'errors': 'Recipe is already in the favorite!'}
-            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-        Favorite.objects.create(user=request.user, recipe=recipe)
-        fields = ['id', 'name', 'image', 'cooking_time']
-        serializer = self.get_serializer(recipe, fields=fields)
-        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+        return self.add_user_recipe(
+            request, pk, Favorite,
+            'Recipe is already in the favorite!'
+        )
 
     @favorite_action.mapping.delete
     def favorite_delete_action(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        favorite = Favorite.objects.filter(user_id=request.user.id,
-                                           recipe_id=recipe.id)
-        if not favorite.exists():
-            data = {'errors': 'Recipe is not in favorite!'}
-            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-        favorite.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.remove_user_recipe(
+            request, pk, Favorite,
+            'Recipe is not in favorite!'
+        )
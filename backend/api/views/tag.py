@@ -2,12 +2,14 @@ from rest_framework import permissions
 
 from recipes.models import Tag
 
-from ..mixins import ListRetrieveModelViewSet
+from ..mixins import ListRetrieveModelViewSet, SnapshotListMixin
 from ..serializers import TagSerializer
+from ..snapshots import TAGS_VERSION
 
 
-class TagViewSet(ListRetrieveModelViewSet):
+class TagViewSet(SnapshotListMixin, ListRetrieveModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     http_method_names = ['get']
     permission_classes = [permissions.AllowAny]
+    snapshot_name = TAGS_VERSION
@@ -1,17 +1,22 @@
-from django.db.models import Count
+from django.db.models import Value
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from users.models import Subscription, User
+from recipes.subscriptions import subscribe, unsubscribe
+from users.models import User
 
 from ..mixins import ListRetrieveCreateModelViewSet
 from ..paginations import PageNumberLimitPagination
 from ..permissions import IsAuthOrListOnlyPermission
 from ..serializers import (UserSerializer, UserSetPasswordSerializer,
                            UserSubscriptionsSerializer)
-from ..utils import is_subscribed
+from ..utils import is_subscribed, prefetch_latest_recipes
+from ..validators import integer_validator
+
+AUTHOR_FIELDS = ['id', 'username', 'email', 'first_name', 'last_name',
+                 'recipes_count']
 
 
 class UserViewSet(ListRetrieveCreateModelViewSet):
@@ -42,25 +47,28 @@ class UserViewSet(ListRetrieveCreateModelViewSet):
         current_user.set_password(serializer.validated_data['new_password'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def get_user_subscriptions_queryset(self):
-        return (User.objects
-                .prefetch_related('recipes')
-                .annotate(is_subscribed=is_subscribed(self.request.user.id))
-                .annotate(recipes_count=Count('recipes'))
-                .order_by('username'))
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        # 0 means no limit like a missing parameter.
+        return integer_validator('recipes_limit', recipes_limit,
+                                 min_value=0) or None
 
     @action(detail=False, methods=['get'],
             url_path='subscriptions',
             serializer_class=UserSubscriptionsSerializer,
             permission_classes=[permissions.IsAuthenticated])
     def subscriptions_action(self, request):
-        authors = (self.get_user_subscriptions_queryset()
-                   .filter(following__user_id=self.request.user.id))
-        paginated_authors = self.paginate_queryset(authors)
-        recipes_limit = request.query_params.get('recipes_limit', None)
-        serializer = self.get_serializer(paginated_authors,
-                                         recipes_limit=recipes_limit,
-                                         many=True)
+        authors = (User.objects.only(*AUTHOR_FIELDS)
+                   .filter(following__user_id=self.request.user.id)
+                   .annotate(is_subscribed=Value(True))
+                   .order_by('username'))
+        recipes_limit = self.get_recipes_limit()
+        paginated_authors = prefetch_latest_recipes(
+            self.paginate_queryset(authors), recipes_limit
+        )
+        serializer = self.get_serializer(paginated_authors, many=True)
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'],
@@ -68,24 +76,22 @@ class UserViewSet(ListRetrieveCreateModelViewSet):
             serializer_class=UserSubscriptionsSerializer,
             permission_classes=[permissions.IsAuthenticated])
     def subscribe_action(self, request, pk):
-        author = get_object_or_404(self.get_user_subscriptions_queryset(),
-                                   id=pk)
-        if author.is_subscribed:
+        recipes_limit = self.get_recipes_limit()
+        author = get_object_or_404(User.objects.only(*AUTHOR_FIELDS), id=pk)
+        # The insert does nothing when the subscription already exists,
+        # so concurrent requests cannot violate the unique constraint.
+        if not subscribe(request.user.id, author.id):
             data = {'errors': 'Subscription on this author already exists!'}
             return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-        Subscription.objects.create(user=request.user, author=author)
-        recipes_limit = request.query_params.get('recipes_limit', None)
-        data = self.get_serializer(author, recipes_limit=recipes_limit).data
-        data['is_subscribed'] = True
+        author.is_subscribed = True
+        prefetch_latest_recipes([author], recipes_limit)
+        data = self.get_serializer(author).data
         return Response(data=data, status=status.HTTP_201_CREATED)
 
     @subscribe_action.mapping.delete
     def shopping_cart_delete_action(self, request, pk):
-        author = get_object_or_404(User, id=pk)
-        subscription = Subscription.objects.filter(user_id=request.user.id,
-                                                   author_id=author.id)
-        if not subscription.exists():
+        if not unsubscribe(request.user.id, pk):
+            get_object_or_404(User, id=pk)
             data = {'errors': 'Subscription on this author not exists!'}
             return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-        subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
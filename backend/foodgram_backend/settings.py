@@ -103,11 +103,48 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION',
+                              default='/tmp/foodgram_cache'),
+    }
+}
+
+# Recipe representations are built by the database with JSON functions.
+RECIPE_JSON_IN_DATABASE = (
+    os.getenv('RECIPE_JSON_IN_DATABASE', default='False') == 'True'
+)
+
+# Uploads to the recipe API are streamed to temporary files
+# and limited in size, see api.upload_handlers.
+FILE_UPLOAD_MAX_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_SIZE', default=10 * 1024 * 1024)
+)
+
+# Threads of the local pool for background tasks,
+# 0 runs tasks right away in the calling thread.
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', default=2))
+
+# Seconds between in-process garbage collections, 0 disables them.
+GARBAGE_COLLECTION_INTERVAL = int(
+    os.getenv('GARBAGE_COLLECTION_INTERVAL', default=0)
+)
+
+# TrueType font with Cyrillic glyphs for PDF shopping lists.
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 if 'test' in sys.argv:
     DATABASES['default'] = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': 'test_db.sqlite3'
     }
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+    WORKER_THREADS = 0
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+from api.ingredient_index import warm_up_ingredient_index  # noqa: E402
+from recipes.garbage import start_garbage_collector  # noqa: E402
+
+warm_up_ingredient_index()
+
+if settings.GARBAGE_COLLECTION_INTERVAL:
+    start_garbage_collector(settings.GARBAGE_COLLECTION_INTERVAL)
@@ -1,11 +1,14 @@
 from django.contrib import admin
 
-from recipes.models import (Favorite, Ingredient, IngredientRecipe,
-                            MeasurementUnit, Recipe, ShoppingCart, Tag)
+from recipes.models import (Favorite, FeedEntry, Ingredient, IngredientRecipe,
+                            MeasurementUnit, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
 
 admin.site.register(Tag)
 admin.site.register(MeasurementUnit)
 admin.site.register(ShoppingCart)
+admin.site.register(ShoppingListItem)
+admin.site.register(FeedEntry)
 admin.site.register(Favorite)
 admin.site.register(IngredientRecipe)
 
@@ -28,7 +31,7 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @staticmethod
     def in_favorite_count(obj):
-        return obj.favorite.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -0,0 +1,73 @@
+from django.db import connection
+
+from users.models import Subscription
+
+from .garbage import batched
+from .models import FeedEntry, Recipe
+
+BATCH_SIZE = 1000
+# Entries are only inserted for subscriptions which exist at that moment,
+# a locked subscription is not deleted until they are committed,
+# so `prune_feed` of a concurrent unsubscribe sees them.
+INSERT_SQL = '''
+INSERT INTO {feed} (user_id, recipe_id, author_id, pub_date)
+SELECT s.user_id, r.id, r.author_id, r.pub_date
+FROM {subscription} s JOIN {recipe} r ON r.author_id = s.author_id
+WHERE {condition}{lock}
+ON CONFLICT (user_id, recipe_id) DO NOTHING
+'''
+
+
+def add_entries(condition, params):
+    lock = (' FOR SHARE OF s' if connection.features.has_select_for_update_of
+            else '')
+    sql = INSERT_SQL.format(feed=FeedEntry._meta.db_table,
+                            subscription=Subscription._meta.db_table,
+                            recipe=Recipe._meta.db_table,
+                            condition=condition, lock=lock)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def fan_out_recipe(recipe_id, batch_size=BATCH_SIZE):
+    """
+    Pushes the recipe into timelines of all followers of its author
+    in ranges of `batch_size` followers.
+    """
+    author_id = (Recipe.objects.filter(id=recipe_id)
+                 .values_list('author_id', flat=True).first())
+    if author_id is None:
+        return
+    followers = (Subscription.objects.filter(author_id=author_id)
+                 .order_by('user_id').values_list('user_id', flat=True)
+                 .iterator(chunk_size=batch_size))
+    for batch in batched(followers, batch_size):
+        add_entries('r.id = %s AND s.user_id BETWEEN %s AND %s',
+                    [recipe_id, batch[0], batch[-1]])
+
+
+def backfill_feed(user_id, author_id):
+    # Nothing is added when the user has unfollowed in the meantime.
+    add_entries('s.user_id = %s AND s.author_id = %s', [user_id, author_id])
+
+
+def prune_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_feeds(batch_size=BATCH_SIZE):
+    FeedEntry.objects.all().delete()
+    entries = (Recipe.objects.filter(author__following__isnull=False)
+               .order_by()
+               .values_list('author__following__user_id', 'id',
+                            'author_id', 'pub_date')
+               .iterator(chunk_size=batch_size))
+    count = 0
+    for batch in batched(entries, batch_size):
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id, pub_date=pub_date)
+             for user_id, recipe_id, author_id, pub_date in batch]
+        )
+        count += len(batch)
+    return count
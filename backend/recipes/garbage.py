@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .images import VARIANTS_DIRECTORY
+from .models import IngredientRecipe, Recipe
+
+BATCH_SIZE = 1000
+GRACE_PERIOD = timedelta(hours=1)
+LOCK_KEY = 'garbage_collection_lock'
+
+logger = logging.getLogger(__name__)
+
+
+def batched(iterable, size):
+    batch = list()
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = list()
+    if batch:
+        yield batch
+
+
+def collect_orphans(batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Deletes IngredientRecipe rows without a recipe, returns their number.
+    """
+    orphans = (IngredientRecipe.objects.filter(recipe__isnull=True)
+               .order_by().values_list('id', flat=True)
+               .iterator(chunk_size=batch_size))
+    deleted = 0
+    for batch in batched(orphans, batch_size):
+        if not dry_run:
+            IngredientRecipe.objects.filter(id__in=batch).delete()
+        deleted += len(batch)
+    return deleted
+
+
+def list_files(storage, directory):
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return [], []
+    return directories, [os.path.join(directory, name) for name in files]
+
+
+def list_images(storage, directory):
+    """
+    Yields stored images and their variants
+    together with the name of the original image.
+    """
+    _, files = list_files(storage, directory)
+    for name in files:
+        yield name, name
+    directories, _ = list_files(storage, VARIANTS_DIRECTORY)
+    for original in directories:
+        _, files = list_files(storage,
+                              os.path.join(VARIANTS_DIRECTORY, original))
+        for name in files:
+            yield name, os.path.join(directory, original)
+
+
+def collect_images(batch_size=BATCH_SIZE, grace_period=GRACE_PERIOD,
+                   dry_run=False):
+    """
+    Deletes recipe images and their variants which no recipe refers to
+    and which are older than `grace_period`,
+    returns the number of files and their size.
+    """
+    field = Recipe._meta.get_field('image')
+    storage = field.storage
+    # Files of uploads which are not committed yet are left alone.
+    deadline = timezone.now() - grace_period
+    deleted, reclaimed = 0, 0
+    for batch in batched(list_images(storage, field.upload_to), batch_size):
+        referenced = set(Recipe.objects.filter(
+            image__in={original for _, original in batch}
+        ).values_list('image', flat=True))
+        for name, original in batch:
+            if original in referenced:
+                continue
+            try:
+                if storage.get_modified_time(name) > deadline:
+                    continue
+                size = storage.size(name)
+                if not dry_run:
+                    storage.delete(name)
+            except FileNotFoundError:
+                continue
+            deleted += 1
+            reclaimed += size
+    return deleted, reclaimed
+
+
+def collect_garbage(batch_size=BATCH_SIZE, grace_period=GRACE_PERIOD,
+                    dry_run=False):
+    rows = collect_orphans(batch_size, dry_run)
+    files, reclaimed = collect_images(batch_size, grace_period, dry_run)
+    return {'rows': rows, 'files': files, 'bytes': reclaimed}
+
+
+def run_scheduled_collection(interval):
+    # Only one process collects garbage during an interval.
+    if not cache.add(LOCK_KEY, True, timeout=interval):
+        return
+    try:
+        stats = collect_garbage()
+        logger.info('Garbage collected: %(rows)s rows, %(files)s files, '
+                    '%(bytes)s bytes', stats)
+    except (DatabaseError, OSError):
+        logger.exception('Garbage collection failed')
+    finally:
+        connection.close()
+
+
+def start_garbage_collector(interval):
+    """
+    Runs `collect_garbage` every `interval` seconds in a daemon thread.
+    """
+    def run():
+        run_scheduled_collection(interval)
+        start_garbage_collector(interval)
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
+    return timer
@@ -0,0 +1,110 @@
+import base64
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+VARIANTS_DIRECTORY = 'recipes/variants'
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+PLACEHOLDER_WIDTH = 16
+
+logger = logging.getLogger(__name__)
+
+
+def variants_directory(name):
+    return f'{VARIANTS_DIRECTORY}/{os.path.basename(name)}'
+
+
+def flatten(image):
+    # Orientation is applied to pixels because EXIF is not written back.
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def resize(image, width):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def encode(image, image_format, options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def make_placeholder(image):
+    content = encode(resize(image, PLACEHOLDER_WIDTH), 'JPEG', {'quality': 40})
+    return f'data:image/jpeg;base64,{base64.b64encode(content).decode()}'
+
+
+def save_variants(storage, name, image):
+    directory = variants_directory(name)
+    widths = ([width for width in VARIANT_WIDTHS if width < image.width]
+              or [image.width])
+    variants = list()
+    for width in widths:
+        resized = resize(image, width)
+        variant = {'width': width}
+        for extension, (image_format, options) in VARIANT_FORMATS.items():
+            path = f'{directory}/{width}.{extension}'
+            if storage.exists(path):
+                storage.delete(path)
+            variant[extension] = storage.save(
+                path, ContentFile(encode(resized, image_format, options))
+            )
+        variants.append(variant)
+    return variants
+
+
+def make_image_variants(storage, name):
+    with storage.open(name, 'rb') as file:
+        image = flatten(Image.open(file))
+    return {
+        'placeholder': make_placeholder(image),
+        # Variants have fixed names, so they are not content-addressed.
+        'variants': save_variants(default_storage, name, image),
+    }
+
+
+def process_recipe_image(recipe_id):
+    """
+    Saves resized metadata-free copies of the recipe image
+    and a tiny inline placeholder to `Recipe.image_variants`.
+    """
+    recipe = Recipe.objects.filter(id=recipe_id).only('id', 'image').first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    # Recipes with the same image share one file and its variants.
+    image_variants = (Recipe.objects.filter(image=name)
+                      .exclude(image_variants={})
+                      .values_list('image_variants', flat=True).first())
+    if image_variants is None:
+        try:
+            image_variants = make_image_variants(recipe.image.storage, name)
+        except (OSError, Image.DecompressionBombError) as error:
+            logger.warning('Image %s was not processed: %s', name, error)
+            return
+    with transaction.atomic():
+        recipe = (Recipe.objects.select_for_update()
+                  .filter(id=recipe_id, image=name).first())
+        # A replaced image gets its own variants,
+        # these ones are left for the garbage collector.
+        if recipe is not None:
+            recipe.image_variants = image_variants
+            recipe.save(update_fields=['image_variants'])
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from recipes.garbage import BATCH_SIZE, GRACE_PERIOD, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete orphan ingredient rows and unreferenced recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--grace-minutes', type=int,
+                            default=int(GRACE_PERIOD.total_seconds() // 60))
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = collect_garbage(
+            batch_size=options['batch_size'],
+            grace_period=timedelta(minutes=options['grace_minutes']),
+            dry_run=options['dry_run'],
+        )
+        action = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f'{action} {stats["rows"]} orphan ingredient rows')
+        self.stdout.write(f'{action} {stats["files"]} images, '
+                          f'{stats["bytes"]} bytes')
+        self.stdout.write(self.style.SUCCESS(
+            'Garbage has been collected successfully'
+        ))
@@ -3,6 +3,8 @@ import sys
 
 from django.core.management.base import BaseCommand
 
+from api.ingredient_index import INGREDIENTS_VERSION
+from api.utils import bump_cache_version
 from recipes.models import Ingredient, MeasurementUnit
 
 INGREDIENTS_FILE = 'static/ingredients.json'
@@ -35,6 +37,8 @@ class Command(BaseCommand):
         except Exception as error:
             self.stderr.write(f'{error}\nIngredients import failed!')
             return
+        finally:
+            bump_cache_version(INGREDIENTS_VERSION)
 
         self.stdout.write(self.style.SUCCESS(
             'Everything has been imported successfully'
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feeds import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Recalculate subscription feeds from subscriptions'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            entries = rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Feeds have been rebuilt, {entries} entries'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.shopping_lists import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Recalculate shopping lists from shopping carts'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            items = rebuild_shopping_lists()
+        self.stdout.write(self.style.SUCCESS(
+            f'Shopping lists have been rebuilt, {items} items'
+        ))
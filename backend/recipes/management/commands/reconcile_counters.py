@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.signals import COUNTERS
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized counters which drifted from real data'
+
+    @staticmethod
+    def count_related(related_model, fk_name):
+        return Coalesce(Subquery(
+            related_model.objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by().values(fk_name).annotate(count=Count('pk'))
+            .values('count')
+        ), 0)
+
+    def reconcile(self, related_model, model, fk_name, field):
+        actual = self.count_related(related_model, fk_name)
+        drifted = list(model.objects.annotate(actual=actual)
+                       .exclude(**{field: F('actual')})
+                       .values_list('pk', flat=True))
+        for start in range(0, len(drifted), BATCH_SIZE):
+            model.objects.filter(
+                pk__in=drifted[start:start + BATCH_SIZE]
+            ).update(**{field: actual})
+        return len(drifted)
+
+    def handle(self, *args, **options):
+        for related_model, (model, fk_name, field) in COUNTERS.items():
+            fixed = self.reconcile(related_model, model, fk_name, field)
+            self.stdout.write(f'{model.__name__}.{field}: '
+                              f'{fixed} rows fixed')
+        self.stdout.write(self.style.SUCCESS(
+            'Counters have been reconciled successfully'
+        ))
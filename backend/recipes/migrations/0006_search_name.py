@@ -0,0 +1,39 @@
+# Generated by Django 4.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+def normalize_name(name):
+    return ' '.join(name.casefold().replace('ё', 'е').split())
+
+
+def fill_search_names(apps, schema_editor):
+    for model_name in ['Ingredient', 'Recipe']:
+        model = apps.get_model('recipes', model_name)
+        objs = list(model.objects.only('id', 'name'))
+        for obj in objs:
+            obj.search_name = normalize_name(obj.name)
+        model.objects.bulk_update(objs, ['search_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_alter_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200, verbose_name='Ключ поиска'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200, verbose_name='Ключ поиска'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.1 on 2026-10-18 03:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Both backends index 'ё' as 'е' like `normalize_name` does for queries.
+POSTGRESQL_FORWARD = [
+    '''
+    CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', translate(
+                coalesce(NEW.name, ''), 'ёЁ', 'еЕ')), 'A')
+            || setweight(to_tsvector('russian', translate(
+                coalesce(NEW.text, ''), 'ёЁ', 'еЕ')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER recipes_recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector()
+    ''',
+    'UPDATE recipes_recipe SET name = name',
+    '''
+    CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector)
+    ''',
+]
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX recipe_search_vector_idx',
+    'DROP TRIGGER recipes_recipe_search_vector ON recipes_recipe',
+    'DROP FUNCTION recipes_recipe_search_vector()',
+]
+
+SQLITE_FOLD = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+SQLITE_NEW = (f"{SQLITE_FOLD.format('new.name')}, "
+              f"{SQLITE_FOLD.format('new.text')}")
+SQLITE_OLD = (f"{SQLITE_FOLD.format('old.name')}, "
+              f"{SQLITE_FOLD.format('old.text')}")
+# The contentless table keeps only the index,
+# deletes need the values which were indexed.
+SQLITE_FORWARD = [
+    '''
+    CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5(
+        name, text, content='', tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER recipes_recipe_fts_insert AFTER INSERT ON recipes_recipe
+    BEGIN
+        INSERT INTO recipes_recipe_fts (rowid, name, text)
+        VALUES (new.id, {SQLITE_NEW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER recipes_recipe_fts_delete AFTER DELETE ON recipes_recipe
+    BEGIN
+        INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, {SQLITE_OLD});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipe
+    BEGIN
+        INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, {SQLITE_OLD});
+        INSERT INTO recipes_recipe_fts (rowid, name, text)
+        VALUES (new.id, {SQLITE_NEW});
+    END
+    ''',
+    f'''
+    INSERT INTO recipes_recipe_fts (rowid, name, text)
+    SELECT id, {SQLITE_NEW.replace('new.', '')} FROM recipes_recipe
+    ''',
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER recipes_recipe_fts_update',
+    'DROP TRIGGER recipes_recipe_fts_delete',
+    'DROP TRIGGER recipes_recipe_fts_insert',
+    'DROP TABLE recipes_recipe_fts',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRESQL_FORWARD,
+                            'sqlite': SQLITE_FORWARD}),
+            run_for_vendor({'postgresql': POSTGRESQL_BACKWARD,
+                            'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
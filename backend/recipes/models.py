@@ -1,7 +1,9 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
-from users.models import User
+from users.models import CounterFieldsMixin, User
 
+from .storage import ContentAddressedStorage
 from .validators import (color_hex_validator, min_amount_validator,
                          min_cooking_time_validator)
 
@@ -59,6 +61,12 @@ class Ingredient(models.Model):
         max_length=200,
         blank=False,
     )
+    search_name = models.CharField(
+        verbose_name='Ключ поиска',
+        max_length=200,
+        db_index=True,
+        editable=False,
+    )
     measurement_unit = models.ForeignKey(
         MeasurementUnit,
         verbose_name='Единица измерения',
@@ -82,12 +90,20 @@ class Ingredient(models.Model):
         return f'{self.name} [{self.measurement_unit}]'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
+    counter_fields = ('favorites_count', 'in_carts_count')
+
     name = models.CharField(
         verbose_name='Название',
         max_length=200,
         blank=False,
     )
+    search_name = models.CharField(
+        verbose_name='Ключ поиска',
+        max_length=200,
+        db_index=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Описание',
         blank=False,
@@ -100,8 +116,14 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='recipes/',
+        storage=ContentAddressedStorage(),
         blank=False,
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии картинки',
+        default=dict,
+        editable=False,
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -125,13 +147,34 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         auto_now_add=True,
-        db_index=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах покупок',
+        default=0,
+        editable=False,
+    )
+    # Filled by a database trigger, see recipes.search.
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
     )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return f'Рецепт "{self.name}"'
@@ -168,6 +211,88 @@ class ShoppingCart(models.Model):
         return f'{self.user} shopping cart: {self.recipe}'
 
 
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        ordering = ['user', 'ingredient']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            ),
+        ]
+
+    def __str__(self):
+        return (f'{self.user} shopping list: {self.ingredient.name} - '
+                f'{self.total_amount} {self.ingredient.measurement_unit}')
+
+
+class FeedEntry(models.Model):
+    """
+    Recipe in the timeline of a follower of its author,
+    `author` and `pub_date` are copied from the recipe.
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='feed',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        ordering = ['user', '-pub_date', '-recipe']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_entry_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_entry_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} feed: {self.recipe}'
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
@@ -0,0 +1,54 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe
+from .utils import normalize_name
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+# Name matches weigh more than matches in the description.
+FTS_RANK_SQL = f'''
+SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE}
+WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {Recipe._meta.db_table}.id
+'''
+FTS_MATCH_SQL = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+
+
+def search_postgresql(queryset, words):
+    # Only word characters are left, so the raw query has no other syntax.
+    search_query = SearchQuery(' & '.join(f'{word}:*' for word in words),
+                               config=SEARCH_CONFIG, search_type='raw')
+    return (queryset.filter(search_vector=search_query)
+            .annotate(search_rank=SearchRank(F('search_vector'),
+                                             search_query)))
+
+
+def search_sqlite(queryset, words):
+    # Quoted words are not parsed as FTS5 syntax, `*` matches prefixes.
+    match = ' AND '.join(f'"{word}"*' for word in words)
+    return (queryset.filter(id__in=RawSQL(FTS_MATCH_SQL, [match]))
+            .annotate(search_rank=RawSQL(FTS_RANK_SQL, [match],
+                                         output_field=FloatField())))
+
+
+SEARCH_BACKENDS = {
+    'postgresql': search_postgresql,
+    'sqlite': search_sqlite,
+}
+
+
+def search_recipes(queryset, query):
+    """
+    Filters recipes by a full-text query on name and text
+    and annotates them with `search_rank`, higher is better.
+    Every word of the query matches as a prefix.
+    """
+    words = re.findall(r'\w+', normalize_name(query))
+    if not words:
+        return queryset.annotate(search_rank=Value(0.0)).none()
+    vendor = connections[queryset.db].vendor
+    return SEARCH_BACKENDS[vendor](queryset, words)
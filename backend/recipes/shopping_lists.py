@@ -0,0 +1,92 @@
+from django.db import connection
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from users.models import User
+
+from .models import IngredientRecipe, ShoppingCart, ShoppingListItem
+
+INCREASE_SQL = '''
+INSERT INTO {table} (user_id, ingredient_id, total_amount)
+SELECT carts.user_id, deltas.ingredient_id, deltas.amount
+FROM ({carts}) carts, ({deltas}) deltas
+WHERE true
+ON CONFLICT (user_id, ingredient_id)
+DO UPDATE SET total_amount = {table}.total_amount + excluded.total_amount
+'''
+
+
+def recipe_amounts(recipe_id):
+    return dict(IngredientRecipe.objects.filter(recipe_id=recipe_id)
+                .order_by().values_list('ingredient_id', 'amount'))
+
+
+def increase_amounts(carts, increases):
+    carts_sql, carts_params = carts.query.sql_with_params()
+    deltas_sql = ' UNION ALL '.join(
+        ['SELECT %s AS ingredient_id, %s AS amount'] * len(increases)
+    )
+    deltas_params = [value for delta in increases.items() for value in delta]
+    sql = INCREASE_SQL.format(table=ShoppingListItem._meta.db_table,
+                              carts=carts_sql, deltas=deltas_sql)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*carts_params, *deltas_params])
+
+
+def decrease_amounts(carts, decreases):
+    items = ShoppingListItem.objects.filter(user_id__in=carts,
+                                            ingredient_id__in=decreases)
+    amount = Case(*[When(ingredient_id=ingredient_id, then=Value(delta))
+                    for ingredient_id, delta in decreases.items()],
+                  default=Value(0))
+    items.update(total_amount=Greatest(F('total_amount') - amount, 0))
+    items.filter(total_amount=0).delete()
+
+
+def recipes_amounts(recipe_ids):
+    return dict(IngredientRecipe.objects.filter(recipe_id__in=recipe_ids)
+                .order_by().values('ingredient_id')
+                .annotate(total_amount=Sum('amount'))
+                .values_list('ingredient_id', 'total_amount'))
+
+
+def apply_deltas(carts, deltas):
+    increases = {ingredient_id: delta
+                 for ingredient_id, delta in deltas.items() if delta > 0}
+    decreases = {ingredient_id: -delta
+                 for ingredient_id, delta in deltas.items() if delta < 0}
+    if increases:
+        increase_amounts(carts, increases)
+    if decreases:
+        decrease_amounts(carts, decreases)
+
+
+def change_shopping_lists(deltas, **cart_filter):
+    """
+    Adds `deltas` of ingredient amounts to shopping lists of users
+    whose shopping carts match `cart_filter`.
+    """
+    apply_deltas(ShoppingCart.objects.filter(**cart_filter)
+                 .order_by().values('user_id'), deltas)
+
+
+def change_shopping_list(user_id, deltas):
+    # Also used when the cart of the user is already empty.
+    apply_deltas(User.objects.filter(id=user_id)
+                 .order_by().values(user_id=F('id')), deltas)
+
+
+def rebuild_shopping_lists():
+    ShoppingListItem.objects.all().delete()
+    totals = (IngredientRecipe.objects
+              .filter(recipe__shopping_cart__isnull=False)
+              .order_by()
+              .values('recipe__shopping_cart__user_id', 'ingredient_id')
+              .annotate(total_amount=Sum('amount')))
+    return len(ShoppingListItem.objects.bulk_create(
+        [ShoppingListItem(user_id=total['recipe__shopping_cart__user_id'],
+                          ingredient_id=total['ingredient_id'],
+                          total_amount=total['total_amount'])
+         for total in totals],
+        batch_size=1000,
+    ))
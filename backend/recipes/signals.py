@@ -0,0 +1,86 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from users.models import Subscription, User
+
+from .feeds import backfill_feed, fan_out_recipe, prune_feed
+from .models import Favorite, Ingredient, Recipe, ShoppingCart
+from .shopping_lists import change_shopping_lists, recipe_amounts
+from .utils import normalize_name
+from .workers import run_after_commit
+
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Subscription: (User, 'author_id', 'followers_count'),
+}
+
+
+@receiver(pre_save, sender=Ingredient)
+@receiver(pre_save, sender=Recipe)
+def fill_search_name(instance, **kwargs):
+    instance.search_name = normalize_name(instance.name)
+
+
+def change_counter(sender, instance, delta):
+    model, fk_name, field = COUNTERS[sender]
+    model.objects.filter(pk=getattr(instance, fk_name)).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def increase_counter(sender, instance, created, raw, **kwargs):
+    # Loaded fixtures already contain counters.
+    if created and not raw:
+        change_counter(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def decrease_counter(sender, instance, **kwargs):
+    change_counter(sender, instance, -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, raw, **kwargs):
+    if created and not raw:
+        change_shopping_lists(recipe_amounts(instance.recipe_id),
+                              user_id=instance.user_id,
+                              recipe_id=instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    # The cart row is still there to select the shopping list.
+    amounts = recipe_amounts(instance.recipe_id)
+    change_shopping_lists({ingredient_id: -amount
+                           for ingredient_id, amount in amounts.items()},
+                          user_id=instance.user_id,
+                          recipe_id=instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def push_to_feeds(instance, created, raw, **kwargs):
+    if created and not raw:
+        run_after_commit(fan_out_recipe, instance.id)
+
+
+@receiver(post_save, sender=Subscription)
+def fill_feed(instance, created, raw, **kwargs):
+    if created and not raw:
+        run_after_commit(backfill_feed, instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_feed(instance, **kwargs):
+    prune_feed(instance.user_id, instance.author_id)
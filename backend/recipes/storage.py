@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files under the SHA-256 of their content,
+    saving identical content again returns the existing file.
+    """
+
+    @staticmethod
+    def get_content_name(name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(os.path.dirname(name),
+                            f'{digest.hexdigest()}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            pass
+        try:
+            # Reuse restarts the grace period of the garbage collector.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            # Collected in the meantime, so it is stored again.
+            return super().save(name, content, max_length)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # The same name means the same content, so it is never changed.
+        # Also raised when a concurrent request has just saved the file.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
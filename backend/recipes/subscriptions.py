@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.dispatch import Signal
+
+from users.models import Subscription, User
+
+from .feeds import backfill_feed, prune_feed
+from .signals import change_counter
+from .user_recipes import execute
+from .workers import run_after_commit
+
+INSERT_SQL = '''
+INSERT INTO {table} (user_id, author_id)
+SELECT %s, id FROM {users} WHERE id = %s
+ON CONFLICT (user_id, author_id) DO NOTHING
+RETURNING author_id
+'''
+DELETE_SQL = '''
+DELETE FROM {table} WHERE user_id = %s AND author_id = %s
+RETURNING author_id
+'''
+
+# Sent instead of model signals which raw statements bypass.
+subscriptions_changed = Signal()
+
+
+def change_subscription(sql, user_id, author_id, delta):
+    changed = execute(sql.format(table=Subscription._meta.db_table,
+                                 users=User._meta.db_table),
+                      [user_id, author_id])
+    if not changed:
+        return False
+    change_counter(Subscription,
+                   Subscription(user_id=user_id, author_id=author_id), delta)
+    subscriptions_changed.send(sender=Subscription, user_id=user_id,
+                               author_id=author_id)
+    return True
+
+
+@transaction.atomic
+def subscribe(user_id, author_id):
+    """
+    Subscribes the user to an existing author with one statement,
+    returns False when the subscription already exists.
+    """
+    if not change_subscription(INSERT_SQL, user_id, author_id, 1):
+        return False
+    run_after_commit(backfill_feed, user_id, author_id)
+    return True
+
+
+@transaction.atomic
+def unsubscribe(user_id, author_id):
+    if not change_subscription(DELETE_SQL, user_id, author_id, -1):
+        return False
+    prune_feed(user_id, author_id)
+    return True
@@ -0,0 +1,97 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
+
+from .models import Recipe, ShoppingCart, ShoppingListItem
+from .shopping_lists import change_shopping_list, recipes_amounts
+from .signals import COUNTERS
+
+INSERT_SQL = '''
+INSERT INTO {table} (user_id, recipe_id)
+SELECT %s, id FROM {recipes} WHERE id IN ({ids})
+ON CONFLICT (user_id, recipe_id) DO NOTHING
+RETURNING recipe_id
+'''
+DELETE_SQL = '''
+DELETE FROM {table} WHERE user_id = %s{condition}
+RETURNING recipe_id
+'''
+
+# Bulk statements bypass model signals, so they send this one instead.
+user_recipes_changed = Signal()
+
+
+def execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def change_counters(model, recipe_ids, delta):
+    _, _, field = COUNTERS[model]
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def insert_user_recipes(model, user_id, recipe_ids):
+    sql = INSERT_SQL.format(table=model._meta.db_table,
+                            recipes=Recipe._meta.db_table,
+                            ids=', '.join(['%s'] * len(recipe_ids)))
+    return execute(sql, [user_id, *recipe_ids])
+
+
+def delete_user_recipes(model, user_id, recipe_ids=None):
+    condition, params = '', [user_id]
+    if recipe_ids is not None:
+        condition = ' AND recipe_id IN ({})'.format(
+            ', '.join(['%s'] * len(recipe_ids))
+        )
+        params.extend(recipe_ids)
+    sql = DELETE_SQL.format(table=model._meta.db_table, condition=condition)
+    return execute(sql, params)
+
+
+@transaction.atomic
+def add_user_recipes(model, user_id, recipe_ids):
+    """
+    Adds existing recipes of `recipe_ids` to the favorites or the cart
+    of the user with one statement, returns ids of the added ones.
+    """
+    if not recipe_ids:
+        return []
+    added = insert_user_recipes(model, user_id, recipe_ids)
+    if not added:
+        return added
+    change_counters(model, added, 1)
+    if model is ShoppingCart:
+        change_shopping_list(user_id, recipes_amounts(added))
+    user_recipes_changed.send(sender=model, user_id=user_id,
+                              recipe_ids=added)
+    return added
+
+
+@transaction.atomic
+def remove_user_recipes(model, user_id, recipe_ids=None):
+    """
+    Removes recipes of `recipe_ids`, or all of them when it is None,
+    from the favorites or the cart of the user,
+    returns ids of the removed ones.
+    """
+    if recipe_ids is not None and not recipe_ids:
+        return []
+    removed = delete_user_recipes(model, user_id, recipe_ids)
+    if not removed:
+        return removed
+    change_counters(model, removed, -1)
+    if model is ShoppingCart and recipe_ids is None:
+        ShoppingListItem.objects.filter(user_id=user_id).delete()
+    elif model is ShoppingCart:
+        change_shopping_list(user_id, {
+            ingredient_id: -amount
+            for ingredient_id, amount in recipes_amounts(removed).items()
+        })
+    user_recipes_changed.send(sender=model, user_id=user_id,
+                              recipe_ids=removed)
+    return removed
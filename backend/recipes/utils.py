@@ -0,0 +1,2 @@
+def normalize_name(name):
+    return ' '.join(name.casefold().replace('ё', 'е').split())
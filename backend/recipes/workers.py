@@ -0,0 +1,48 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.WORKER_THREADS,
+                thread_name_prefix='foodgram-worker',
+            )
+    return _executor
+
+
+def run_task(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+        raise
+    finally:
+        connection.close()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Runs `func` in the local worker pool,
+    or right away when `WORKER_THREADS` is 0.
+    """
+    if not settings.WORKER_THREADS:
+        func(*args, **kwargs)
+        return None
+    return get_executor().submit(run_task, func, *args, **kwargs)
+
+
+def run_after_commit(func, *args, **kwargs):
+    transaction.on_commit(lambda: run_in_background(func, *args, **kwargs))
@@ -4,7 +4,28 @@ from django.db import models
 from .validators import username_regex_validator
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Counters are changed by `F()` updates only, so saving a loaded row
+    does not write back values which concurrent updates have changed.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
+    counter_fields = ('recipes_count', 'followers_count')
+
     username = models.CharField(
         verbose_name='Юзернэйм',
         max_length=150,
@@ -28,6 +49,16 @@ class User(AbstractUser):
         max_length=150,
         blank=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Пользователь'